@@ -13,10 +13,12 @@ from .main import ShotuxApp
 from .screenshot_manager import ScreenshotManager
 from .config_manager import ConfigManager
 from .hotkey_manager import HotkeyManager
+from .frame_ring import FrameClient
 
 __all__ = [
     "ShotuxApp",
     "ScreenshotManager", 
     "ConfigManager",
     "HotkeyManager",
+    "FrameClient",
 ]
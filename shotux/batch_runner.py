@@ -0,0 +1,190 @@
+"""
+Batch Runner Module
+Runs scripted capture jobs through a single warm ScreenshotManager.
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .annotations import load_annotation_spec
+from .metrics import metrics
+from .screenshot_manager import image_extension
+
+
+class BatchRunner:
+    """Run JSON-lines capture jobs and report per-job status as JSON lines.
+
+    Each job is an object such as::
+
+        {"mode": "region", "geometry": "800x600+0+0", "output": "a.png"}
+        {"mode": "window", "window": "0x3a00007", "format": "JPEG"}
+        {"mode": "fullscreen", "annotate": [{"type": "blur", "box": [0, 0, 400, 40]}]}
+
+    Captures run one after another on the calling thread, while encoding
+    and writing are handed to a worker pool so the next capture can start
+    immediately. At most two encodes per worker are queued, so a fast
+    capture loop cannot pile up raw frames in memory. A failing job is
+    reported and the batch carries on.
+    """
+
+    def __init__(self, screenshot_manager, config_manager, workers=None, out=None,
+                 export_manager=None):
+        self.screenshot_manager = screenshot_manager
+        self.config_manager = config_manager
+        self.export_manager = export_manager
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.out = out or sys.stdout
+
+    def run(self, source):
+        """Run all jobs read from a path, or stdin when source is '-'.
+
+        Returns the number of failed jobs.
+        """
+        if source == '-':
+            return self.run_lines(sys.stdin)
+        with open(source, 'r') as f:
+            return self.run_lines(f)
+
+    def run_lines(self, lines):
+        """Run jobs from an iterable of JSON lines."""
+        failures = 0
+        pending = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for index, line in enumerate(lines, start=1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    job = json.loads(line)
+                    if not isinstance(job, dict):
+                        raise ValueError("job must be a JSON object")
+                    started = time.perf_counter()
+                    screenshot = self._capture(job)
+                    if screenshot is None:
+                        raise Exception("capture returned no image")
+                    screenshot = self.screenshot_manager.post_process(
+                        screenshot, self._annotations(job))
+                    self.screenshot_manager.publish_frame(screenshot)
+                    capture_ms = (time.perf_counter() - started) * 1000
+                except Exception as e:
+                    failures += 1
+                    self._emit({'job': index, 'status': 'error', 'error': str(e)})
+                    continue
+
+                pending.append(pool.submit(self._encode, index, job, screenshot, capture_ms))
+                pending, failed = self._drain(pending)
+                failures += failed
+                # Backpressure: raw frames are large, so cap queued encodes
+                while len(pending) >= 2 * self.workers:
+                    if self._report(pending.pop(0).result()):
+                        failures += 1
+                metrics.set_gauge('shotux_queue_depth', len(pending), queue='batch-encode')
+
+            for future in pending:
+                if self._report(future.result()):
+                    failures += 1
+        return failures
+
+    def _drain(self, pending):
+        """Report finished jobs, returning the ones still running and the failure count."""
+        still_running = []
+        failed = 0
+        for future in pending:
+            if not future.done():
+                still_running.append(future)
+            elif self._report(future.result()):
+                failed += 1
+        return still_running, failed
+
+    def _report(self, status):
+        """Emit a status line, returning True if the job failed."""
+        self._emit(status)
+        return status['status'] != 'ok'
+
+    def _capture(self, job):
+        """Capture the image described by a job."""
+        mode = job.get('mode', 'fullscreen')
+        if mode == 'fullscreen':
+            return self.screenshot_manager.capture_fullscreen()
+        elif mode == 'window':
+            if job.get('window') is not None:
+                return self.screenshot_manager.capture_window_id(job['window'])
+            return self.screenshot_manager.capture_window()
+        elif mode == 'region':
+            if job.get('geometry') is not None:
+                return self.screenshot_manager.capture_geometry(*parse_geometry(job['geometry']))
+            return self.screenshot_manager.capture_region()
+        elif mode == 'scrolling':
+            if job.get('geometry') is None:
+                raise ValueError("scrolling jobs require a 'geometry'")
+            return self.screenshot_manager.capture_scrolling(*parse_geometry(job['geometry']))
+        raise ValueError(f"Unknown capture mode: {mode}")
+
+    def _annotations(self, job):
+        """Return the job's annotation spec, or None to use the configured one."""
+        spec = job.get('annotate')
+        if isinstance(spec, str):
+            return load_annotation_spec(spec)
+        return spec
+
+    def _encode(self, index, job, screenshot, capture_ms):
+        """Encode and write one captured image (runs on a worker thread)."""
+        try:
+            started = time.perf_counter()
+            image_format = job.get('format') or self.config_manager.get('image_format', 'PNG')
+            output = job.get('output') or self._default_output(index, image_format)
+            directory = os.path.dirname(output)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.screenshot_manager.save_screenshot(screenshot, output, image_format)
+            if self.export_manager:
+                self.export_manager.submit(output)
+            return {
+                'job': index,
+                'status': 'ok',
+                'output': output,
+                'width': screenshot.width,
+                'height': screenshot.height,
+                'capture_ms': round(capture_ms, 2),
+                'encode_ms': round((time.perf_counter() - started) * 1000, 2),
+            }
+        except Exception as e:
+            return {'job': index, 'status': 'error', 'error': str(e)}
+
+    def _default_output(self, index, image_format):
+        """Build a timestamped path in the configured save directory."""
+        save_dir = self.config_manager.get('save_directory')
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"screenshot_{timestamp}_{index:04d}.{image_extension(image_format)}"
+        return os.path.join(save_dir, filename)
+
+    def _emit(self, status):
+        """Write a single JSON status line."""
+        self.out.write(json.dumps(status) + '\n')
+        self.out.flush()
+
+
+def parse_geometry(geometry):
+    """Parse 'WxH+X+Y', 'x,y,w,h' or a [x, y, w, h] list into (x, y, w, h)."""
+    try:
+        if isinstance(geometry, (list, tuple)):
+            values = [int(v) for v in geometry]
+        elif isinstance(geometry, dict):
+            values = [int(geometry[k]) for k in ('x', 'y', 'width', 'height')]
+        elif 'x' in geometry:
+            size, _, offset = geometry.partition('+')
+            width, height = size.split('x')
+            x, y = offset.split('+')
+            values = [int(x), int(y), int(width), int(height)]
+        else:
+            values = [int(v) for v in geometry.split(',')]
+    except (ValueError, TypeError, KeyError):
+        values = None
+    if not values or len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+        raise ValueError(f"Invalid geometry {geometry!r}: expected 'WxH+X+Y', 'x,y,w,h' "
+                         f"or [x, y, w, h] with a positive width and height")
+    return tuple(values)
@@ -0,0 +1,221 @@
+"""
+Capture History Module
+Keeps recent captures in memory so they can be re-exported without re-capturing.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+
+from PIL import Image
+
+from .screenshot_manager import image_extension
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # Optional; zlib level 1 is the fallback codec
+    lz4_frame = None
+
+
+class HistoryEntry:
+    """A compressed raw capture."""
+
+    __slots__ = ('timestamp', 'mode', 'size', 'codec', 'data')
+
+    def __init__(self, timestamp, mode, size, codec, data):
+        self.timestamp = timestamp
+        self.mode = mode
+        self.size = size
+        self.codec = codec
+        self.data = data
+
+    def to_image(self):
+        """Decompress the entry back into a PIL image."""
+        if self.codec == 'lz4':
+            raw = lz4_frame.decompress(self.data)
+        else:
+            raw = zlib.decompress(self.data)
+        return Image.frombytes(self.mode, self.size, raw)
+
+    def describe(self):
+        """Summary used by the CLI listing."""
+        return {
+            'time': datetime.fromtimestamp(self.timestamp).isoformat(timespec='seconds'),
+            'width': self.size[0],
+            'height': self.size[1],
+            'stored_bytes': len(self.data),
+        }
+
+
+class CaptureHistory:
+    """Hold the last captures compressed under an entry count and byte budget.
+
+    Raw pixels are compressed with LZ4 when available, otherwise zlib at
+    level 1, which is far cheaper than PNG encoding and keeps re-export
+    instant. The oldest entries are evicted first.
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        self.entries = deque()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def add(self, image):
+        """Compress and store a capture, evicting old entries as needed."""
+        if not self.config_manager.get('history.enabled', True):
+            return
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA')
+        raw = image.tobytes()
+        if lz4_frame is not None:
+            codec, data = 'lz4', lz4_frame.compress(raw)
+        else:
+            codec, data = 'zlib', zlib.compress(raw, 1)
+        entry = HistoryEntry(time.time(), image.mode, image.size, codec, data)
+
+        max_entries = self.config_manager.get('history.max_entries', 20)
+        max_bytes = self.config_manager.get('history.max_bytes', 256 * 1024 * 1024)
+        with self.lock:
+            self.entries.appendleft(entry)
+            self.total_bytes += len(data)
+            while len(self.entries) > 1 and (len(self.entries) > max_entries
+                                             or self.total_bytes > max_bytes):
+                self.total_bytes -= len(self.entries.pop().data)
+
+    def get(self, index=0):
+        """Return the capture at index (0 is the most recent) as an image."""
+        with self.lock:
+            if index >= len(self.entries):
+                raise IndexError(f"Only {len(self.entries)} captures in history")
+            entry = self.entries[index]
+        return entry.to_image()
+
+    def describe(self):
+        """List stored captures, most recent first."""
+        with self.lock:
+            return [entry.describe() for entry in self.entries]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class HistoryServer:
+    """Serve history requests from shotux-cli over a Unix socket.
+
+    Requests and responses are single JSON lines, for example
+    {"action": "save", "count": 3, "directory": "/tmp"} or
+    {"action": "copy", "index": 1}.
+    """
+
+    def __init__(self, history, screenshot_manager, config_manager):
+        self.history = history
+        self.screenshot_manager = screenshot_manager
+        self.config_manager = config_manager
+        self.path = history_socket_path(config_manager)
+        self.server = None
+
+    def start(self):
+        """Start listening in a background thread."""
+        if self.server:
+            return
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Stale socket from an earlier run
+        handler = self._handler_class()
+        self.server = socketserver.ThreadingUnixStreamServer(self.path, handler)
+        self.server.daemon_threads = True
+        os.chmod(self.path, 0o600)
+        threading.Thread(target=self.server.serve_forever, name='shotux-history',
+                         daemon=True).start()
+
+    def stop(self):
+        """Stop listening and remove the socket."""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        try:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        except Exception:
+            pass  # Ignore cleanup errors
+
+    def handle(self, request):
+        """Run one request and return the response object."""
+        action = request.get('action')
+        if action == 'list':
+            return {'status': 'ok', 'captures': self.history.describe()}
+        elif action == 'copy':
+            self.screenshot_manager.copy_to_clipboard(self.history.get(request.get('index', 0)))
+            return {'status': 'ok'}
+        elif action == 'save':
+            return {'status': 'ok', 'files': self._save(request)}
+        raise ValueError(f"Unknown history action: {action}")
+
+    def _save(self, request):
+        """Save the most recent captures to files.
+
+        'output' names the file for a single capture; several captures go
+        into 'directory' (or the save directory) under timestamped names.
+        """
+        count = min(request.get('count', 1), len(self.history))
+        if count == 0:
+            raise IndexError("History is empty")
+        if request.get('output') and request.get('count', 1) > 1:
+            raise ValueError("'output' names a single file; use 'directory' to save several captures")
+        image_format = request.get('format') or self.config_manager.get('image_format', 'PNG')
+        if request.get('output'):
+            paths = [request['output']]
+        else:
+            directory = request.get('directory') or self.config_manager.get('save_directory')
+            os.makedirs(directory, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            extension = image_extension(image_format)
+            paths = [os.path.join(directory, f"screenshot_{timestamp}_last{i + 1}.{extension}")
+                     for i in range(count)]
+        for index, path in enumerate(paths):
+            self.screenshot_manager.save_screenshot(self.history.get(index), path, image_format)
+        return paths
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    response = server.handle(json.loads(self.rfile.readline()))
+                except Exception as e:
+                    response = {'status': 'error', 'error': str(e)}
+                self.wfile.write((json.dumps(response) + '\n').encode())
+
+        return Handler
+
+
+def history_socket_path(config_manager):
+    """Path of the Unix socket a running shotux GUI listens on."""
+    path = config_manager.get('history.socket')
+    if path:
+        return os.path.expanduser(path)
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"shotux-{os.getuid()}.sock")
+
+
+def request_history(config_manager, request, timeout=30):
+    """Send a request to a running shotux process and return its response."""
+    path = history_socket_path(config_manager)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            sock.sendall((json.dumps(request) + '\n').encode())
+            with sock.makefile('r') as response:
+                return json.loads(response.readline())
+    except (FileNotFoundError, ConnectionRefusedError):
+        raise Exception("No running shotux GUI with capture history was found")
@@ -6,24 +6,94 @@ Allows for direct screenshot capture without GUI.
 
 import sys
 import argparse
+import json
 import os
+import time
 
-from .screenshot_manager import ScreenshotManager
+from .screenshot_manager import ScreenshotManager, image_extension
 from .config_manager import ConfigManager
+from .batch_runner import BatchRunner, parse_geometry
+from .annotations import load_annotation_spec
+from .export_manager import ExportManager
+from .capture_history import request_history
+from .metrics import MetricsExporter, metrics_textfiles
 
 
 def main():
     parser = argparse.ArgumentParser(description='Shotux Screenshot Tool CLI')
-    parser.add_argument('--capture', choices=['fullscreen', 'window', 'region'],
+    parser.add_argument('--capture', choices=['fullscreen', 'window', 'region', 'scrolling'],
                        help='Capture mode')
     parser.add_argument('--output', '-o', help='Output file path')
     parser.add_argument('--delay', '-d', type=int, default=0,
                        help='Delay in seconds before capture')
     parser.add_argument('--clipboard', '-c', action='store_true',
                        help='Copy to clipboard')
+    parser.add_argument('--until-stable', action='store_true',
+                       help='Capture as soon as the screen stops changing instead of sleeping')
+    parser.add_argument('--stable-ms', type=int,
+                       help='Milliseconds without change required by --until-stable')
+    parser.add_argument('--stable-timeout', type=float,
+                       help='Maximum seconds to wait with --until-stable')
+    parser.add_argument('--geometry', '-g',
+                       help="Region as WxH+X+Y or x,y,w,h (region and scrolling modes)")
+    parser.add_argument('--max-frames', type=int,
+                       help='Maximum frames captured in scrolling mode')
+    parser.add_argument('--scroll-clicks', type=int,
+                       help='Wheel clicks sent between frames in scrolling mode')
+    parser.add_argument('--annotate', '-a', metavar='SPEC',
+                       help='Redactions/annotations to apply, as JSON or a path to a JSON file')
+    parser.add_argument('--batch', metavar='FILE',
+                       help="Run JSON-lines capture jobs from FILE ('-' for stdin)")
+    parser.add_argument('--workers', type=int,
+                       help='Encoder threads used by --batch')
+    parser.add_argument('--save-last', type=int, nargs='?', const=1, metavar='N',
+                       help='Save the last N captures held by the running GUI '
+                            '(--output is a directory when N > 1)')
+    parser.add_argument('--copy-last', type=int, nargs='?', const=1, metavar='N',
+                       help='Copy the Nth most recent capture held by the running GUI '
+                            '(the clipboard holds a single image)')
+    parser.add_argument('--history', action='store_true',
+                       help='List captures held by the running GUI')
+    parser.add_argument('--stats', action='store_true',
+                       help='Show metrics written by running shotux processes')
+    parser.add_argument('--shared-memory', action='store_true',
+                       help='Publish --batch captures to the shared-memory frame ring')
+    
+    subparsers = parser.add_subparsers(dest='command')
+    diff_parser = subparsers.add_parser('diff', help='Compare two images or two directories of images')
+    diff_parser.add_argument('before', help='Reference image or directory')
+    diff_parser.add_argument('after', help='New image or directory')
+    diff_parser.add_argument('--output', '-o',
+                             help='Highlight image path (or directory when comparing directories)')
+    diff_parser.add_argument('--tolerance', '-t', type=int, default=0,
+                             help='Per-channel difference (0-255) ignored as noise')
+    diff_parser.add_argument('--min-pixels', type=int, default=1,
+                             help='Changed pixels a tile needs before it counts')
+    diff_parser.add_argument('--tile-size', type=positive_int, default=64,
+                             help='Tile edge length in pixels')
+    diff_parser.add_argument('--check', action='store_true',
+                             help="Only report 'same' or 'different', stopping at the first change")
+    diff_parser.add_argument('--workers', type=int, dest='diff_workers',
+                             help='Processes used when comparing directories')
     
     args = parser.parse_args()
     
+    if args.command == 'diff':
+        run_diff(args)
+        return
+        
+    if args.stats:
+        show_stats()
+        return
+        
+    if args.batch:
+        run_batch(args)
+        return
+        
+    if args.save_last or args.copy_last or args.history:
+        run_history(args)
+        return
+        
     if not args.capture:
         parser.print_help()
         return
@@ -31,11 +101,23 @@ def main():
     # Initialize managers
     config_manager = ConfigManager()
     screenshot_manager = ScreenshotManager(config_manager)
+    export_manager = ExportManager(config_manager)
     
     try:
         # Apply delay
-        if args.delay > 0:
-            import time
+        until_stable = args.until_stable or config_manager.get('until_stable', False)
+        if until_stable:
+            # Only watch the captured area when it is known up front
+            bbox = None
+            if args.geometry and args.capture in ('region', 'scrolling'):
+                x, y, width, height = parse_geometry(args.geometry)
+                bbox = (x, y, x + width, y + height)
+            waited, stable = screenshot_manager.wait_until_stable(
+                bbox=bbox, stable_ms=args.stable_ms, timeout=args.stable_timeout, delay=args.delay)
+            if stable is not None:
+                state = "stable" if stable else "still changing (timed out)"
+                print(f"Screen {state} after {waited:.2f}s (configured delay: {args.delay}s)")
+        elif args.delay > 0:
             time.sleep(args.delay)
             
         # Capture screenshot
@@ -44,15 +126,29 @@ def main():
         elif args.capture == 'window':
             screenshot = screenshot_manager.capture_window()
         elif args.capture == 'region':
-            screenshot = screenshot_manager.capture_region()
+            if args.geometry:
+                screenshot = screenshot_manager.capture_geometry(*parse_geometry(args.geometry))
+            else:
+                screenshot = screenshot_manager.capture_region()
+        elif args.capture == 'scrolling':
+            if not args.geometry:
+                parser.error('--capture scrolling requires --geometry')
+            screenshot = screenshot_manager.capture_scrolling(
+                *parse_geometry(args.geometry),
+                max_frames=args.max_frames, scroll_clicks=args.scroll_clicks)
             
         if not screenshot:
             print("Screenshot capture failed or was cancelled")
             return
             
+        # Apply redactions before anything is written out
+        annotations = load_annotation_spec(args.annotate) if args.annotate else None
+        screenshot = screenshot_manager.post_process(screenshot, annotations)
+            
         # Process screenshot
         if args.output:
             screenshot.save(args.output)
+            export_manager.submit(args.output)
             print(f"Screenshot saved to: {args.output}")
             
         if args.clipboard:
@@ -65,16 +161,159 @@ def main():
             save_dir = config_manager.get('save_directory')
             os.makedirs(save_dir, exist_ok=True)
             
+            image_format = config_manager.get('image_format', 'PNG')
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"screenshot_{timestamp}.png"
+            filename = f"screenshot_{timestamp}.{image_extension(image_format)}"
             filepath = os.path.join(save_dir, filename)
             
-            screenshot.save(filepath)
+            screenshot_manager.save_screenshot(screenshot, filepath, image_format)
+            export_manager.submit(filepath)
             print(f"Screenshot saved to: {filepath}")
             
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    finally:
+        finish_exports(export_manager, config_manager)
+
+
+def positive_int(value):
+    """argparse type for options that must be 1 or more."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def run_batch(args):
+    """Run a batch of capture jobs with one set of warm managers."""
+    config_manager = ConfigManager()
+    if args.shared_memory:
+        config_manager.set('shared_memory.enabled', True)
+    config_manager.start_watching()  # Long batches pick up config edits
+    screenshot_manager = ScreenshotManager(config_manager)
+    export_manager = ExportManager(config_manager)
+    export_manager.start()
+    metrics_exporter = MetricsExporter(config_manager, 'batch')
+    metrics_exporter.start()
+    runner = BatchRunner(screenshot_manager, config_manager, workers=args.workers,
+                         export_manager=export_manager)
+    
+    try:
+        failures = runner.run(args.batch)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        screenshot_manager.cleanup_temp_files()
+        screenshot_manager.close_frame_ring()
+        finish_exports(export_manager, config_manager)
+        config_manager.stop_watching()
+        metrics_exporter.stop()
+        
+    if failures:
+        sys.exit(1)
+
+
+def finish_exports(export_manager, config_manager):
+    """Give queued exports a short window before the process exits.
+    
+    Anything still pending stays in the on-disk queue and is retried by the
+    next shotux process.
+    """
+    if not export_manager.flush(config_manager.get('export.flush_timeout', 5)):
+        print(f"{export_manager.pending()} exports still pending; they will be retried later",
+              file=sys.stderr)
+    export_manager.stop()
+
+
+def show_stats():
+    """Print every process's latest metrics textfile as a compact table."""
+    config_manager = ConfigManager()
+    paths = metrics_textfiles(config_manager)
+    if not paths:
+        print("No metrics found; set metrics.enabled in a running shotux process")
+        sys.exit(1)
+        
+    for path in paths:
+        age = time.time() - path.stat().st_mtime
+        print(f"Metrics from {path} ({age:.0f}s old)")
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '_bucket{' in line:
+                    continue
+                name, _, value = line.rpartition(' ')
+                print(f"  {name:<70} {value}")
+
+
+def run_history(args):
+    """Re-export captures from a running shotux GUI without re-capturing."""
+    config_manager = ConfigManager()
+    if args.history:
+        request = {'action': 'list'}
+    elif args.copy_last:
+        request = {'action': 'copy', 'index': args.copy_last - 1}
+    else:
+        request = {'action': 'save', 'count': args.save_last}
+        if args.output and (args.save_last > 1 or os.path.isdir(args.output)):
+            request['directory'] = os.path.abspath(args.output)
+        elif args.output:
+            request['output'] = os.path.abspath(args.output)
+            
+    try:
+        response = request_history(config_manager, request)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+        
+    if response.get('status') != 'ok':
+        print(f"Error: {response.get('error')}")
+        sys.exit(1)
+    if args.history:
+        for index, capture in enumerate(response['captures'], start=1):
+            print(f"{index}: {capture['time']} {capture['width']}x{capture['height']} "
+                  f"({capture['stored_bytes']} bytes stored)")
+    elif args.copy_last:
+        print("Screenshot copied to clipboard")
+    else:
+        for path in response['files']:
+            print(f"Screenshot saved to: {path}")
+
+
+def run_diff(args):
+    """Compare images and exit 0 when everything matches, 1 otherwise."""
+    from .image_diff import diff_directories, diff_files
+    
+    options = {
+        'tile_size': args.tile_size,
+        'tolerance': args.tolerance,
+        'min_pixels': args.min_pixels,
+        'stop_early': args.check,
+    }
+    output = None if args.check else args.output
+    
+    if os.path.isdir(args.before) and os.path.isdir(args.after):
+        summaries = diff_directories(args.before, args.after, output,
+                                     workers=args.diff_workers or args.workers, **options)
+    elif os.path.isfile(args.before) and os.path.isfile(args.after):
+        summaries = [diff_files(args.before, args.after, output, **options)]
+    else:
+        print("Error: diff needs two image files or two directories", file=sys.stderr)
+        sys.exit(2)
+        
+    all_same = True
+    for summary in summaries:
+        all_same = all_same and summary['same']
+        if args.check:
+            if not all_same:
+                break
+        else:
+            print(json.dumps(summary))
+            
+    if args.check:
+        print("same" if all_same else "different")
+    sys.exit(0 if all_same else 1)
 
 
 if __name__ == "__main__":
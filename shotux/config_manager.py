@@ -3,9 +3,70 @@ Configuration Manager Module
 Handles application configuration and settings.
 """
 
+import copy
+import ctypes
+import ctypes.util
+import fcntl
 import json
 import os
+import select
+import stat
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from types import MappingProxyType
+
+# inotify event flags (see inotify(7))
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def freeze(value):
+    """Return a read-only copy of a parsed JSON value."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Return a plain, JSON-serialisable copy of a frozen value."""
+    if isinstance(value, MappingProxyType):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+class ConfigSnapshot:
+    """An immutable view of one parsed configuration.
+
+    Every dotted key ('ui.theme', 'ui', ...) is resolved once when the
+    snapshot is built, so lookups are a single dict access.
+    """
+
+    def __init__(self, config):
+        self.lookup = {}
+        self._flatten(freeze(config), '')
+
+    def _flatten(self, value, prefix):
+        """Index every nested key under its dotted path."""
+        for key, item in value.items():
+            path = prefix + key
+            self.lookup[path] = item
+            if isinstance(item, MappingProxyType):
+                self._flatten(item, path + '.')
+
+    def get(self, key, default=None):
+        """Get a value by dotted key."""
+        return self.lookup.get(key, default)
 
 
 class ConfigManager:
@@ -19,6 +80,48 @@ class ConfigManager:
             'save_directory': str(Path.home() / 'Pictures' / 'Screenshots'),
             'image_format': 'PNG',
             'image_quality': 95,
+            'until_stable': False,
+            'annotations': [],
+            'exports': [],
+            'export': {
+                'queue_directory': None,
+                'concurrency': 4,
+                'max_attempts': 10,
+                'retry_backoff': 2,
+                'timeout': 30,
+                'flush_timeout': 5
+            },
+            'history': {
+                'enabled': True,
+                'max_entries': 20,
+                'max_bytes': 268435456,
+                'socket': None
+            },
+            'metrics': {
+                'enabled': False,
+                'textfile': None,
+                'interval': 15
+            },
+            'shared_memory': {
+                'enabled': False,
+                'name': 'shotux-frames',
+                'slots': 3,
+                'max_frame_bytes': 0
+            },
+            'stability': {
+                'stable_ms': 300,
+                'timeout': 10,
+                'sample_interval': 0.02,
+                'downscale': 8,
+                'threshold': 2
+            },
+            'scrolling': {
+                'scroll_clicks': 5,
+                'settle_ms': 150,
+                'max_frames': 50,
+                'min_overlap': 8,
+                'pixels_per_click': None
+            },
             'hotkeys': {
                 'fullscreen': 'Print',
                 'window': 'alt+Print', 
@@ -30,7 +133,11 @@ class ConfigManager:
                 'show_notifications': True
             }
         }
+        self.overrides = {}
         self.config = self.load_config()
+        self.snapshot = ConfigSnapshot(self.config)
+        self.listeners = []
+        self.watcher = None
         
     def load_config(self):
         """Load configuration from file."""
@@ -41,57 +148,89 @@ class ConfigManager:
                     # Merge with defaults to ensure all keys exist
                     return self._merge_config(self.default_config, config)
             else:
-                return self.default_config.copy()
+                return copy.deepcopy(self.default_config)
         except Exception as e:
             print(f"Warning: Failed to load config: {e}")
-            return self.default_config.copy()
+            return copy.deepcopy(self.default_config)
             
     def save_config(self, config_updates=None):
-        """Save configuration to file."""
+        """Save configuration to file.
+        
+        The file is re-read under the lock and config_updates are merged
+        into it, so changes saved by another process in the meantime are
+        kept. Runtime overrides made with set() are never written.
+        """
         try:
-            # Update config with provided updates
-            if config_updates:
-                self.config.update(config_updates)
-                
-            # Create config directory if it doesn't exist
-            self.config_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Save configuration
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-                
+            self._save(lambda current: self._merge_config(current, config_updates or {}))
         except Exception as e:
             print(f"Warning: Failed to save config: {e}")
             
-    def get(self, key, default=None):
-        """Get configuration value."""
+    def _save(self, update):
+        """Apply update() to the on-disk config and write the result atomically."""
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            config = update(self.load_config())
+            self._write_atomic(self.config_file, config)
+        self.config = self._merge_config(config, self.overrides)
+        self.snapshot = ConfigSnapshot(self.config)
+        
+    @contextmanager
+    def _file_lock(self):
+        """Serialise saves across GUI/CLI processes with a lock file."""
+        lock_path = self.config_file.with_name(self.config_file.name + '.lock')
+        with open(lock_path, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+            
+    def _write_atomic(self, path, config):
+        """Write JSON via a temp file and rename; callers hold the file lock.
+        
+        Readers always see either the old or the new file. The existing
+        file's permissions are carried over to the replacement.
+        """
         try:
-            # Support nested keys like 'ui.theme'
-            keys = key.split('.')
-            value = self.config
-            for k in keys:
-                value = value[k]
-            return value
-        except (KeyError, TypeError):
-            return default
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config, f, indent=2)
+                f.flush()
+                os.fchmod(f.fileno(), mode)  # mkstemp creates files as 0600
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+            
+    def get(self, key, default=None):
+        """Get configuration value (read-only) from the current snapshot."""
+        # Nested keys like 'ui.theme' are precomputed in the snapshot
+        return self.snapshot.get(key, default)
             
     def set(self, key, value):
-        """Set configuration value."""
+        """Override a configuration value for this process.
+        
+        Overrides survive hot reloads and are not written by save_config();
+        pass values to save_config() to persist them.
+        """
         try:
             # Support nested keys like 'ui.theme'
             keys = key.split('.')
-            config = self.config
-            for k in keys[:-1]:
-                if k not in config:
-                    config[k] = {}
-                config = config[k]
-            config[keys[-1]] = value
+            override = {keys[-1]: value}
+            for k in reversed(keys[:-1]):
+                override = {k: override}
+            self.overrides = self._merge_config(self.overrides, override)
+            self.config = self._merge_config(self.config, override)
+            self.snapshot = ConfigSnapshot(self.config)
         except Exception as e:
             print(f"Warning: Failed to set config value: {e}")
             
     def _merge_config(self, default, user):
         """Recursively merge user config with defaults."""
-        merged = default.copy()
+        merged = copy.deepcopy(default)
         for key, value in user.items():
             if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
                 merged[key] = self._merge_config(merged[key], value)
@@ -101,8 +240,10 @@ class ConfigManager:
         
     def reset_to_defaults(self):
         """Reset configuration to defaults."""
-        self.config = self.default_config.copy()
-        self.save_config()
+        try:
+            self._save(lambda current: copy.deepcopy(self.default_config))
+        except Exception as e:
+            print(f"Warning: Failed to save config: {e}")
         
     def export_config(self, filepath):
         """Export configuration to a file."""
@@ -117,11 +258,138 @@ class ConfigManager:
         try:
             with open(filepath, 'r') as f:
                 imported_config = json.load(f)
-                self.config = self._merge_config(self.default_config, imported_config)
-                self.save_config()
+            self._save(lambda current: self._merge_config(self.default_config, imported_config))
         except Exception as e:
             raise Exception(f"Failed to import config: {e}")
             
     def get_config_path(self):
         """Get the path to the configuration file."""
         return str(self.config_file)
+        
+    def reload(self):
+        """Re-read the config file and swap in a new snapshot if it changed.
+        
+        Listeners are called with (old_snapshot, new_snapshot). Returns True
+        when the configuration changed. Overrides made with set() are
+        applied on top of the reloaded file.
+        """
+        config = self._merge_config(self.load_config(), self.overrides)
+        if config == self.config:
+            return False
+        old_snapshot = self.snapshot
+        self.config = config
+        self.snapshot = ConfigSnapshot(config)
+        for listener in list(self.listeners):
+            try:
+                listener(old_snapshot, self.snapshot)
+            except Exception as e:
+                print(f"Warning: Config listener failed: {e}")
+        return True
+        
+    def add_listener(self, callback):
+        """Register a callback run after a hot reload."""
+        self.listeners.append(callback)
+        
+    def start_watching(self):
+        """Reload automatically when config.json changes on disk."""
+        if self.watcher is None:
+            self.config_dir.mkdir(parents=True, exist_ok=True)
+            self.watcher = ConfigWatcher(self)
+            self.watcher.start()
+            
+    def stop_watching(self):
+        """Stop the hot-reload watcher."""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
+
+class ConfigWatcher:
+    """Watch the config directory with inotify and trigger reloads.
+    
+    The directory is watched rather than the file because atomic saves
+    replace the file. Falls back to polling the modification time when
+    inotify is unavailable.
+    """
+    
+    def __init__(self, config_manager, poll_interval=1.0):
+        self.config_manager = config_manager
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+        self.thread = None
+        self.fd = None
+        
+    def start(self):
+        """Start watching in a background thread."""
+        try:
+            self.fd = self._inotify_watch(self.config_manager.config_dir)
+            target = self._watch_inotify
+        except Exception:
+            target = self._watch_polling
+        self.thread = threading.Thread(target=target, name='shotux-config-watch', daemon=True)
+        self.thread.start()
+        
+    def stop(self):
+        """Stop watching and release the inotify descriptor."""
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            
+    def _inotify_watch(self, directory):
+        """Create an inotify descriptor watching a directory."""
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(fd, str(directory).encode(), mask) < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        return fd
+        
+    def _watch_inotify(self):
+        """Reload whenever an inotify event names the config file."""
+        name = self.config_manager.config_file.name.encode()
+        while not self.stopping.is_set():
+            ready, _, _ = select.select([self.fd], [], [], 0.5)
+            if not ready or not self._config_touched(name):
+                continue
+            # Let a burst of events from one save settle before reloading
+            time.sleep(0.05)
+            self._config_touched(name)
+            self.config_manager.reload()
+            
+    def _config_touched(self, name):
+        """Drain pending events and report whether config.json was involved."""
+        touched = False
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            start = offset + INOTIFY_EVENT.size
+            if data[start:start + length].rstrip(b'\0') == name:
+                touched = True
+            offset = start + length
+        return touched
+        
+    def _watch_polling(self):
+        """Reload whenever the config file's modification time changes."""
+        last = self._mtime()
+        while not self.stopping.wait(self.poll_interval):
+            mtime = self._mtime()
+            if mtime != last:
+                self.config_manager.reload()
+            last = mtime
+            
+    def _mtime(self):
+        """Modification time of the config file, or None if it is missing."""
+        try:
+            return self.config_manager.config_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
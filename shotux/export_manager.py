@@ -0,0 +1,348 @@
+"""
+Export Manager Module
+Pushes saved screenshots to configured export targets in the background.
+"""
+
+import asyncio
+import http.client
+import json
+import os
+import shlex
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .config_manager import thaw
+from .metrics import metrics
+
+
+class ExportManager:
+    """Run post-save export targets on a background asyncio loop.
+
+    Targets come from the 'exports' config list, for example::
+
+        {"type": "http", "url": "http://store/upload/{name}", "method": "PUT"}
+        {"type": "directory", "path": "~/Mirror"}
+        {"type": "command", "command": "notify-send Saved {file}"}
+
+    Every export is first written as a job file to an on-disk queue, so
+    submitting never blocks the capture and pending exports survive a
+    restart. A worker claims a job by renaming it to <id>.<pid>.running
+    before running it, so several shotux processes can share one queue.
+    The queue directory is scanned when the worker starts; after that the
+    worker tracks jobs in memory, so finishing a job never rereads the queue.
+    Failed jobs are retried with exponential backoff until
+    'export.max_attempts' is reached.
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+        queue_dir = config_manager.get('export.queue_directory')
+        self.queue_dir = Path(queue_dir).expanduser() if queue_dir else \
+            Path(config_manager.config_dir) / 'export-queue'
+        self.loop = None
+        self.thread = None
+        self.wakeup = None
+        self.stopping = False
+        self.tasks = set()
+        self.connections = {}
+        self.connections_lock = threading.Lock()  # Executor threads share the pool
+        self.in_flight = set()
+        self.jobs = {}  # Queued jobs by id, as (path, job)
+        self.jobs_lock = threading.Lock()
+        self.idle = threading.Event()
+        self.idle.set()
+
+    def targets(self):
+        """Return the configured export targets."""
+        return [t for t in self.config_manager.get('exports', []) or [] if t.get('enabled', True)]
+
+    def start(self):
+        """Start the background worker if any targets are configured."""
+        if self.thread or (not self.targets() and not self._pending_jobs()):
+            return
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self._recover_claims()
+        with self.jobs_lock:
+            for path, job in self._pending_jobs():
+                self.jobs.setdefault(job['id'], (path, job))
+        self.stopping = False
+        self.idle.clear()  # The worker sets it once the first scan is done
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.wakeup = asyncio.Event()
+            ready.set()
+            self.loop.run_until_complete(self._worker())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run, name='shotux-export', daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def submit(self, filepath):
+        """Queue a saved file for every configured target."""
+        targets = self.targets()
+        if not targets:
+            return
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        for target in targets:
+            job = {
+                'id': f"{time.time():.6f}-{uuid.uuid4().hex[:8]}",
+                'file': os.path.abspath(filepath),
+                'target': thaw(target),
+                'attempts': 0,
+                'next_attempt': 0,
+            }
+            path = self._write_job(job)
+            with self.jobs_lock:
+                self.jobs[job['id']] = (path, job)
+        self.idle.clear()
+        self.start()
+        self._wake()
+
+    def flush(self, timeout=None):
+        """Wait until the queue has no due jobs left, up to timeout seconds.
+
+        Returns True only when every job has finished; jobs still waiting
+        for a retry after a failure count as pending.
+        """
+        if not self.thread:
+            return not self.pending()
+        self._wake()
+        return self.idle.wait(timeout) and not self.pending()
+
+    def pending(self):
+        """Number of jobs still queued, including ones waiting for a retry."""
+        with self.jobs_lock:
+            return len(self.jobs)
+
+    def stop(self):
+        """Stop the worker; queued jobs stay on disk for the next start."""
+        if self.thread:
+            self.stopping = True
+            self._wake()
+            self.thread.join(timeout=10)
+        self.thread = None
+        with self.connections_lock:
+            for pool in self.connections.values():
+                for conn in pool:
+                    conn.close()
+            self.connections.clear()
+
+    def _wake(self):
+        """Nudge the worker to look for due jobs."""
+        if self.loop and self.wakeup:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    async def _worker(self):
+        """Dispatch due jobs, respecting the concurrency limit."""
+        limit = asyncio.Semaphore(self.config_manager.get('export.concurrency', 4))
+        while not self.stopping:
+            self.wakeup.clear()
+            now = time.time()
+            waiting = []
+            with self.jobs_lock:
+                pending = sorted(self.jobs.values(), key=lambda item: item[1]['id'])
+            metrics.set_gauge('shotux_queue_depth', len(pending), queue='export')
+            for path, job in pending:
+                if job['id'] in self.in_flight:
+                    continue
+                if job['next_attempt'] > now:
+                    waiting.append(job['next_attempt'] - now)
+                    continue
+                claimed = self._claim(path, job)
+                if claimed is None:
+                    self._forget(job)  # Another process got there first
+                    continue
+                self.in_flight.add(job['id'])
+                task = asyncio.ensure_future(self._run_job(limit, claimed, job))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+            if not self.in_flight:
+                self.idle.set()  # Only jobs waiting for a retry are left
+            timeout = min(waiting) if waiting else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        # Give running uploads a moment; anything unfinished stays queued
+        if self.tasks:
+            _, unfinished = await asyncio.wait(self.tasks, timeout=5)
+            for task in unfinished:
+                task.cancel()
+
+    async def _run_job(self, limit, claimed, job):
+        """Run one claimed job and either remove it or reschedule it."""
+        try:
+            async with limit:
+                await self._export(job['target'], job['file'])
+        except asyncio.CancelledError:
+            self._release(claimed, job)  # Interrupted by stop(); run it next time
+            raise
+        except Exception as e:
+            metrics.inc('shotux_failures_total', backend=f"export-{job['target'].get('type')}")
+            job['attempts'] += 1
+            job['last_error'] = str(e)
+            max_attempts = self.config_manager.get('export.max_attempts', 10)
+            if job['attempts'] >= max_attempts:
+                print(f"Warning: Giving up on export of {job['file']}: {e}")
+                self._write_job(job, suffix='.failed')
+                self._forget(job)
+            else:
+                backoff = self.config_manager.get('export.retry_backoff', 2)
+                job['next_attempt'] = time.time() + min(300, backoff ** job['attempts'])
+                self._write_job(job)
+            self._discard(claimed)
+        else:
+            self._discard(claimed)
+            self._forget(job)
+        finally:
+            self.in_flight.discard(job['id'])
+            self.wakeup.set()
+
+    async def _export(self, target, filepath):
+        """Send a file to a single target."""
+        kind = target.get('type')
+        loop = asyncio.get_event_loop()
+        if kind == 'http':
+            await loop.run_in_executor(None, self._http_upload, target, filepath)
+        elif kind == 'directory':
+            destination = Path(target['path']).expanduser()
+            destination.mkdir(parents=True, exist_ok=True)
+            await loop.run_in_executor(None, shutil.copy2, filepath,
+                                       destination / os.path.basename(filepath))
+        elif kind == 'command':
+            args = [arg.format(**self._placeholders(filepath))
+                    for arg in shlex.split(target['command'])]
+            process = await asyncio.create_subprocess_exec(
+                *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+            _, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise Exception(f"Export command failed: {stderr.decode(errors='replace').strip()}")
+        else:
+            raise ValueError(f"Unknown export type: {kind}")
+
+    def _http_upload(self, target, filepath):
+        """Upload a file over a pooled keep-alive connection."""
+        url = urlsplit(target['url'].format(**self._placeholders(filepath)))
+        key = (url.scheme, url.netloc)
+        conn = self._checkout(key)
+        with open(filepath, 'rb') as f:
+            body = f.read()
+        headers = {'Content-Type': target.get('content_type', 'image/png'),
+                   'Content-Length': str(len(body)),
+                   'Connection': 'keep-alive'}
+        headers.update(target.get('headers', {}))
+        path = url.path or '/'
+        if url.query:
+            path += '?' + url.query
+        try:
+            conn.request(target.get('method', 'PUT').upper(), path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        else:
+            with self.connections_lock:
+                self.connections.setdefault(key, []).append(conn)
+        if response.status >= 300:
+            raise Exception(f"HTTP {response.status} {response.reason}")
+
+    def _checkout(self, key):
+        """Take an idle connection for a host from the pool, or open one."""
+        with self.connections_lock:
+            idle = self.connections.get(key)
+            if idle:
+                return idle.pop()
+        scheme, netloc = key
+        timeout = self.config_manager.get('export.timeout', 30)
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=timeout)
+        return http.client.HTTPConnection(netloc, timeout=timeout)
+
+    def _placeholders(self, filepath):
+        """Values available to {file}/{name} placeholders in targets."""
+        return {'file': filepath, 'name': os.path.basename(filepath)}
+
+    def _pending_jobs(self):
+        """Load queued jobs in submission order."""
+        if not self.queue_dir.exists():
+            return []
+        jobs = []
+        for path in sorted(self.queue_dir.glob('*.json')):
+            try:
+                with open(path, 'r') as f:
+                    jobs.append((path, json.load(f)))
+            except Exception:
+                continue  # Skip partially written or corrupt jobs
+        return jobs
+
+    def _write_job(self, job, suffix='.json'):
+        """Atomically write a job file to the queue."""
+        path = self.queue_dir / f"{job['id']}{suffix}"
+        temp_path = self.queue_dir / f"{job['id']}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(temp_path, path)
+        return path
+
+    def _forget(self, job):
+        """Drop a job from the in-memory queue."""
+        with self.jobs_lock:
+            self.jobs.pop(job['id'], None)
+
+    def _claim(self, path, job):
+        """Take ownership of a queued job, or return None if it is already taken."""
+        claimed = self.queue_dir / f"{job['id']}.{os.getpid()}.running"
+        try:
+            os.rename(path, claimed)  # Atomic; only one process can win
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    def _release(self, claimed, job):
+        """Put a claimed job back in the queue untouched."""
+        try:
+            os.rename(claimed, self.queue_dir / f"{job['id']}.json")
+        except FileNotFoundError:
+            pass
+
+    def _discard(self, claimed):
+        """Remove a finished claim; a missing file just means it is already gone."""
+        try:
+            os.unlink(claimed)
+        except FileNotFoundError:
+            pass
+
+    def _recover_claims(self):
+        """Requeue jobs claimed by processes that have since exited."""
+        for claimed in self.queue_dir.glob('*.running'):
+            job_id, _, pid = claimed.name[:-len('.running')].rpartition('.')
+            if pid.isdigit() and _process_alive(int(pid)):
+                continue
+            try:
+                os.rename(claimed, self.queue_dir / f"{job_id}.json")
+            except FileNotFoundError:
+                pass  # Recovered by someone else
+
+
+def _process_alive(pid):
+    """Whether a process with this pid exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, but belongs to another user
+    return True
@@ -0,0 +1,241 @@
+"""
+Frame Ring Module
+Shares raw capture pixels with other processes through shared memory.
+"""
+
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+MAGIC = b'SHTX'
+VERSION = 2
+DEFAULT_MAX_FRAME_BYTES = 3840 * 2160 * 4  # One 4K RGBA frame
+
+# magic, version, slot count, slot size, latest sequence number, owner pid
+RING_HEADER = struct.Struct('<4sIIQQQ')
+# sequence number, width, height, stride, pixel format, payload length, timestamp
+SLOT_HEADER = struct.Struct('<QIII8sQd')
+SLOT_ALIGN = 64
+
+
+def _slot_offset(index, slot_size):
+    """Byte offset of a slot (header included) inside the segment."""
+    header = -(-RING_HEADER.size // SLOT_ALIGN) * SLOT_ALIGN
+    return header + index * slot_size
+
+
+def _slot_size(frame_bytes):
+    """Slot size for a payload, rounded up so pixel data stays aligned."""
+    header = -(-SLOT_HEADER.size // SLOT_ALIGN) * SLOT_ALIGN
+    return header + -(-frame_bytes // SLOT_ALIGN) * SLOT_ALIGN
+
+
+def _payload_offset(index, slot_size):
+    return _slot_offset(index, slot_size) + -(-SLOT_HEADER.size // SLOT_ALIGN) * SLOT_ALIGN
+
+
+class FramePublisher:
+    """Publish captures into a shared-memory ring of raw frames.
+
+    Each publish writes the pixels into the next slot, then the slot header
+    and finally the ring's latest sequence number, so readers never see a
+    half-written frame as the latest one.
+
+    The header records the owning pid. A segment whose owner has exited is
+    taken over; one owned by a running process raises FileExistsError.
+    """
+
+    def __init__(self, name='shotux-frames', slots=3, max_frame_bytes=DEFAULT_MAX_FRAME_BYTES):
+        self.name = name
+        self.slots = max(2, slots)
+        self.slot_size = _slot_size(max_frame_bytes)
+        self.sequence = 0
+        self.pid = os.getpid()
+        size = _slot_offset(self.slots, self.slot_size)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            _remove_stale(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._write_header()
+
+    @property
+    def capacity(self):
+        """Largest frame payload, in bytes, that fits a slot."""
+        return self.slot_size - _payload_offset(0, self.slot_size) + _slot_offset(0, self.slot_size)
+
+    def _write_header(self, magic=MAGIC):
+        RING_HEADER.pack_into(self.shm.buf, 0, magic, VERSION, self.slots, self.slot_size,
+                              self.sequence, self.pid)
+
+    def publish(self, image):
+        """Copy an image's raw pixels into the ring and return its sequence number."""
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA')
+        data = image.tobytes()
+        if len(data) > self.capacity:
+            raise ValueError(f"Frame of {len(data)} bytes does not fit the shared-memory ring")
+
+        self.sequence += 1
+        index = self.sequence % self.slots
+        offset = _slot_offset(index, self.slot_size)
+        payload = _payload_offset(index, self.slot_size)
+
+        # Mark the slot as being written before touching the pixels
+        SLOT_HEADER.pack_into(self.shm.buf, offset, 0, 0, 0, 0, b'', 0, 0.0)
+        self.shm.buf[payload:payload + len(data)] = data
+        SLOT_HEADER.pack_into(self.shm.buf, offset, self.sequence, image.width, image.height,
+                              len(data) // image.height, image.mode.encode(), len(data), time.time())
+        self._write_header()
+        return self.sequence
+
+    def close(self):
+        """Retire and remove the ring; attached clients keep their mapping until they close."""
+        try:
+            self._write_header(magic=b'\0' * 4)  # Lets clients see the ring is gone
+        except Exception:
+            pass  # Already unmapped
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass  # Ignore cleanup errors
+
+
+class Frame:
+    """A zero-copy view of one frame in the ring.
+
+    The pixels stay in shared memory, so the publisher may overwrite them
+    once it has cycled through the ring. Call is_valid() after processing
+    to confirm the frame was not replaced underneath you.
+    """
+
+    def __init__(self, client, index, sequence, width, height, stride, mode, length, timestamp):
+        self.client = client
+        self.index = index
+        self.sequence = sequence
+        self.width = width
+        self.height = height
+        self.stride = stride
+        self.mode = mode
+        self.length = length
+        self.timestamp = timestamp
+        start = _payload_offset(index, client.slot_size)
+        self.buffer = client.shm.buf[start:start + length]
+
+    def to_numpy(self):
+        """Return the pixels as a (height, width[, channels]) uint8 array without copying."""
+        import numpy as np
+        array = np.frombuffer(self.buffer, dtype=np.uint8)
+        channels = self.stride // self.width
+        if channels == 1:
+            return array.reshape(self.height, self.width)
+        return array.reshape(self.height, self.width, channels)
+
+    def to_image(self):
+        """Return a PIL image copy of the frame."""
+        from PIL import Image
+        return Image.frombytes(self.mode, (self.width, self.height), bytes(self.buffer))
+
+    def is_valid(self):
+        """Check the slot still holds this frame."""
+        return self.client._slot_sequence(self.index) == self.sequence
+
+    def release(self):
+        """Drop the view so the client can be closed."""
+        self.buffer.release()
+
+
+class FrameClient:
+    """Attach to a publisher's ring and read the latest frame."""
+
+    def __init__(self, name='shotux-frames'):
+        self.shm = _attach(name)
+        magic, version, self.slots, self.slot_size, _, _ = RING_HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise Exception(f"Shared memory '{name}' is not a shotux frame ring")
+
+    def retired(self):
+        """Whether the publisher closed this ring (reattach to get the new one)."""
+        return RING_HEADER.unpack_from(self.shm.buf, 0)[0] != MAGIC
+
+    def latest_sequence(self):
+        """Sequence number of the newest frame (0 if none was published)."""
+        return RING_HEADER.unpack_from(self.shm.buf, 0)[4]
+
+    def latest(self):
+        """Return the newest frame, or None if nothing was published yet."""
+        for _ in range(3):
+            sequence = self.latest_sequence()
+            if sequence == 0:
+                return None
+            index = sequence % self.slots
+            header = SLOT_HEADER.unpack_from(self.shm.buf, _slot_offset(index, self.slot_size))
+            if header[0] == sequence:
+                seq, width, height, stride, mode, length, timestamp = header
+                return Frame(self, index, seq, width, height, stride,
+                             mode.rstrip(b'\0').decode(), length, timestamp)
+        return None  # The publisher kept overtaking us
+
+    def wait_for_frame(self, after=0, timeout=None, interval=0.005):
+        """Poll until a frame newer than sequence 'after' is published."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.latest_sequence() <= after:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
+        return self.latest()
+
+    def _slot_sequence(self, index):
+        return SLOT_HEADER.unpack_from(self.shm.buf, _slot_offset(index, self.slot_size))[0]
+
+    def close(self):
+        """Detach from the ring. Release any Frame views first."""
+        self.shm.close()
+
+
+def _remove_stale(name):
+    """Unlink a segment left behind by a publisher that is no longer running."""
+    existing = _attach(name)
+    try:
+        magic, _, _, _, _, owner = RING_HEADER.unpack_from(existing.buf, 0)
+    except struct.error:
+        magic, owner = b'', 0
+    if magic == MAGIC and owner != os.getpid() and _process_alive(owner):
+        existing.close()
+        raise FileExistsError(f"Shared memory '{name}' is in use by running process {owner}")
+    existing.close()
+    stale = shared_memory.SharedMemory(name=name)  # Tracked, so unlink stays balanced
+    stale.close()
+    stale.unlink()
+
+
+def _process_alive(pid):
+    """Whether a process with this pid exists."""
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, but belongs to another user
+    return True
+
+
+def _attach(name):
+    """Attach to an existing segment without letting this process unlink it on exit."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if len(shm.buf) >= RING_HEADER.size and RING_HEADER.unpack_from(shm.buf, 0)[5] == os.getpid():
+        return shm  # Our own ring: the tracker entry belongs to the publisher
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
@@ -59,23 +59,41 @@ class HotkeyManager:
         """Generate xbindkeys configuration content."""
         script_path = os.path.abspath(__file__)
         main_path = os.path.join(os.path.dirname(script_path), '..', 'main.py')
+        hotkeys = self._configured_hotkeys()
         
         config = f'''
 # Shotux hotkeys configuration
 # Full screen capture
 "python3 {main_path} --capture fullscreen"
-    Print
+    {hotkeys['fullscreen']}
 
 # Active window capture  
 "python3 {main_path} --capture window"
-    alt + Print
+    {hotkeys['window']}
 
 # Region selection capture
 "python3 {main_path} --capture region" 
-    shift + Print
+    {hotkeys['region']}
 '''
         return config.strip()
         
+    def _configured_hotkeys(self):
+        """Read hotkeys from the config, in xbindkeys 'mod + Key' notation."""
+        defaults = {'fullscreen': 'Print', 'window': 'alt+Print', 'region': 'shift+Print'}
+        config_manager = getattr(self.screenshot_manager, 'config_manager', None)
+        hotkeys = {}
+        for mode, default in defaults.items():
+            combo = config_manager.get(f'hotkeys.{mode}', default) if config_manager else default
+            hotkeys[mode] = ' + '.join(part.strip() for part in combo.split('+'))
+        return hotkeys
+        
+    def reload_hotkeys(self):
+        """Re-register hotkeys after the configuration changed."""
+        if not self.active:
+            return
+        self.cleanup()
+        self.setup_hotkeys()
+        
     def cleanup(self):
         """Clean up hotkey processes and configuration."""
         self.active = False
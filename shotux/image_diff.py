@@ -0,0 +1,224 @@
+"""
+Image Diff Module
+Fast visual comparison of screenshots for regression checks.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image, ImageChops, ImageDraw
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.webp')
+
+
+def compare_images(before, after, tile_size=64, tolerance=0, min_pixels=1, stop_early=False):
+    """Compare two images tile by tile.
+
+    The per-pixel difference is computed once in C; bands and tiles whose
+    difference is empty are skipped outright, and only the remaining tiles
+    are thresholded, where a pixel counts as changed when any channel moves
+    by more than tolerance. Tiles with fewer than min_pixels changed pixels
+    are ignored. With stop_early the comparison returns at the first
+    changed tile.
+
+    Returns a dict with 'same', 'changed_pixels', 'changed_tiles', 'boxes'
+    (merged [x, y, width, height] regions) and the per-tile masks needed to
+    render a highlight image.
+    """
+    if tile_size < 1:
+        raise ValueError(f"tile_size must be at least 1, got {tile_size}")
+    if before.size != after.size:
+        return {'same': False, 'size_mismatch': [list(before.size), list(after.size)],
+                'changed_pixels': None, 'changed_tiles': 0, 'boxes': [], 'masks': {}}
+
+    before, after = _normalise(before), _normalise(after)
+    if before.mode != after.mode:
+        before, after = before.convert('RGBA'), after.convert('RGBA')
+    tolerance = max(0, min(255, int(tolerance)))
+    result = {'same': True, 'changed_pixels': 0, 'changed_tiles': 0, 'boxes': [], 'masks': {}}
+    diff = _max_channel(ImageChops.difference(before, after))
+    changed_area = diff.getbbox()
+    if changed_area is None:
+        return result
+
+    # Only walk the tile grid inside the changed area, skipping whole bands
+    # and then single tiles whose difference is empty
+    lut = [0] * (tolerance + 1) + [255] * (255 - tolerance)
+    left_edge = changed_area[0] - changed_area[0] % tile_size
+    top_edge = changed_area[1] - changed_area[1] % tile_size
+    for top in range(top_edge, changed_area[3], tile_size):
+        bottom = min(top + tile_size, after.height)
+        band = diff.crop((left_edge, top, changed_area[2], bottom))
+        if band.getbbox() is None:
+            continue
+        for left in range(left_edge, changed_area[2], tile_size):
+            box = (left, top, min(left + tile_size, after.width), bottom)
+            tile = diff.crop(box)
+            if tile.getbbox() is None:
+                continue
+
+            mask = tile.point(lut)
+            changed = mask.histogram()[255]
+            if changed < min_pixels:
+                continue
+
+            result['same'] = False
+            result['changed_pixels'] += changed
+            result['masks'][(left // tile_size, top // tile_size)] = (box, mask)
+            if stop_early:
+                break
+        if stop_early and not result['same']:
+            break
+
+    result['changed_tiles'] = len(result['masks'])
+    result['boxes'] = _merge_tiles(result['masks'])
+    return result
+
+
+def _normalise(image):
+    """Bring an image to a mode that can be compared channel by channel."""
+    if image.mode in ('RGB', 'RGBA', 'L'):
+        return image
+    return image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+
+def _max_channel(diff):
+    """Collapse a multi-band difference into the per-pixel largest channel."""
+    bands = diff.split()
+    merged = bands[0]
+    for band in bands[1:]:
+        merged = ImageChops.lighter(merged, band)
+    return merged
+
+
+def _merge_tiles(masks):
+    """Merge touching changed tiles into tight bounding boxes."""
+    boxes = []
+    seen = set()
+    for start in masks:
+        if start in seen:
+            continue
+        seen.add(start)
+        stack = [start]
+        left = top = None
+        right = bottom = 0
+        while stack:
+            column, row = stack.pop()
+            box, mask = masks[(column, row)]
+            inner = mask.getbbox()
+            if inner:
+                x1, y1 = box[0] + inner[0], box[1] + inner[1]
+                x2, y2 = box[0] + inner[2], box[1] + inner[3]
+                left = x1 if left is None else min(left, x1)
+                top = y1 if top is None else min(top, y1)
+                right, bottom = max(right, x2), max(bottom, y2)
+            for dc in (-1, 0, 1):
+                for dr in (-1, 0, 1):
+                    neighbour = (column + dc, row + dr)
+                    if neighbour in masks and neighbour not in seen:
+                        seen.add(neighbour)
+                        stack.append(neighbour)
+        if left is not None:
+            boxes.append([left, top, right - left, bottom - top])
+    return boxes
+
+
+def render_highlight(after, result, color=(255, 0, 0)):
+    """Return a copy of the new image with changed pixels and regions highlighted."""
+    highlighted = after.convert('RGB')
+    fill = Image.new('RGB', highlighted.size, color)
+    for box, mask in result['masks'].values():
+        highlighted.paste(fill.crop(box), box, mask)
+    draw = ImageDraw.Draw(highlighted)
+    for x, y, width, height in result['boxes']:
+        draw.rectangle((x - 2, y - 2, x + width + 1, y + height + 1), outline=color, width=2)
+    return highlighted
+
+
+def diff_files(before_path, after_path, output_path=None, **options):
+    """Compare two image files and optionally write a highlight image.
+
+    Returns a JSON-serialisable summary of the comparison.
+    """
+    summary = {'before': before_path, 'after': after_path}
+    try:
+        with Image.open(before_path) as before, Image.open(after_path) as after:
+            before.load()
+            after.load()
+            result = compare_images(before, after, **options)
+            if output_path and not result['same'] and 'size_mismatch' not in result:
+                directory = os.path.dirname(output_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                render_highlight(after, result).save(output_path)
+                summary['diff_image'] = output_path
+    except Exception as e:
+        summary.update({'same': False, 'error': str(e)})
+        return summary
+
+    result.pop('masks')
+    summary.update(result)
+    return summary
+
+
+def _diff_pair(job):
+    """Process-pool entry point for one directory pair."""
+    before_path, after_path, output_path, options = job
+    return diff_files(before_path, after_path, output_path, **options)
+
+
+def diff_directories(before_dir, after_dir, output_dir=None, workers=None, **options):
+    """Compare images with matching relative paths in two directories.
+
+    Pairs are compared across a process pool. Yields one summary per pair,
+    plus summaries for images present on only one side. With stop_early,
+    summaries arrive in completion order and queued pairs are cancelled as
+    soon as one differs.
+    """
+    before_files = _image_files(before_dir)
+    after_files = _image_files(after_dir)
+
+    for name in sorted(set(before_files) ^ set(after_files)):
+        side = 'after' if name in before_files else 'before'
+        yield {'name': name, 'same': False, 'error': f"missing in {side}"}
+
+    jobs = []
+    for name in sorted(set(before_files) & set(after_files)):
+        output_path = None
+        if output_dir:
+            output_path = os.path.join(output_dir, os.path.splitext(name)[0] + '.diff.png')
+        jobs.append((before_files[name], after_files[name], output_path, options))
+
+    if not jobs:
+        return
+    if not options.get('stop_early'):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for summary in pool.map(_diff_pair, jobs, chunksize=4):
+                yield summary
+        return
+
+    # Check mode: report pairs as they finish and drop the rest of the queue
+    # on the first difference, or when the caller stops iterating
+    pool = ProcessPoolExecutor(max_workers=workers)
+    futures = [pool.submit(_diff_pair, job) for job in jobs]
+    try:
+        for future in as_completed(futures):
+            summary = future.result()
+            yield summary
+            if not summary['same']:
+                break
+    finally:
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def _image_files(directory):
+    """Map relative paths to absolute paths for every image under a directory."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                files[os.path.relpath(path, directory)] = path
+    return files
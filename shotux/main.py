@@ -12,9 +12,12 @@ from datetime import datetime
 import threading
 import time
 
-from .screenshot_manager import ScreenshotManager
+from .screenshot_manager import ScreenshotManager, image_extension
 from .hotkey_manager import HotkeyManager
 from .config_manager import ConfigManager
+from .export_manager import ExportManager
+from .capture_history import CaptureHistory, HistoryServer
+from .metrics import MetricsExporter
 
 
 class ShotuxApp:
@@ -28,10 +31,22 @@ class ShotuxApp:
         self.config_manager = ConfigManager()
         self.screenshot_manager = ScreenshotManager(self.config_manager)
         self.hotkey_manager = HotkeyManager(self.screenshot_manager)
+        self.export_manager = ExportManager(self.config_manager)
+        self.export_manager.start()  # Resume exports queued by earlier runs
+        self.capture_history = CaptureHistory(self.config_manager)
+        self.history_server = HistoryServer(self.capture_history, self.screenshot_manager,
+                                            self.config_manager)
+        self.metrics_exporter = MetricsExporter(self.config_manager, 'gui')
+        self.metrics_exporter.start()
         
         # Initialize UI
         self.setup_ui()
         self.setup_hotkeys()
+        self.setup_history_server()
+        
+        # Apply edits made to config.json by other processes
+        self.config_manager.add_listener(self.on_config_reloaded)
+        self.config_manager.start_watching()
         
         # Center window
         self.center_window()
@@ -147,6 +162,12 @@ class ShotuxApp:
         browse_btn = ttk.Button(parent, text="Browse...", command=self.browse_directory)
         browse_btn.grid(row=1, column=3, pady=(10, 0))
         
+        # Wait-until-stable option
+        self.until_stable_var = tk.BooleanVar(value=self.config_manager.get('until_stable', False))
+        until_stable_check = ttk.Checkbutton(parent, text="Wait until screen is stable instead of delay",
+                                            variable=self.until_stable_var)
+        until_stable_check.grid(row=2, column=0, columnspan=4, sticky=tk.W, pady=(10, 0))
+        
         # Configure column weights
         parent.columnconfigure(1, weight=1)
         
@@ -168,6 +189,13 @@ class ShotuxApp:
         exit_btn = ttk.Button(parent, text="❌ Exit", command=self.on_closing)
         exit_btn.grid(row=0, column=3, padx=(5, 0))
         
+        # History buttons
+        save_last_btn = ttk.Button(parent, text="💾 Save Last", command=self.save_last)
+        save_last_btn.grid(row=1, column=0, padx=(0, 5), pady=(5, 0))
+        
+        copy_last_btn = ttk.Button(parent, text="📋 Copy Last", command=self.copy_last)
+        copy_last_btn.grid(row=1, column=1, padx=5, pady=(5, 0))
+        
     def setup_hotkeys(self):
         """Set up global hotkeys."""
         try:
@@ -176,6 +204,31 @@ class ShotuxApp:
         except Exception as e:
             self.update_status(f"Warning: Could not register hotkeys - {str(e)}")
             
+    def setup_history_server(self):
+        """Let shotux-cli re-export captures held in this process."""
+        try:
+            self.history_server.start()
+        except Exception as e:
+            self.update_status(f"Warning: Could not start history server - {str(e)}")
+            
+    def on_config_reloaded(self, old, new):
+        """Apply a hot-reloaded configuration (called from the watcher thread)."""
+        def apply():
+            self.delay_var.set(str(new.get('delay', 0)))
+            self.auto_save_var.set(new.get('auto_save', False))
+            self.copy_clipboard_var.set(new.get('copy_clipboard', True))
+            self.save_dir_var.set(new.get('save_directory', self.save_dir_var.get()))
+            self.until_stable_var.set(new.get('until_stable', False))
+            if old.get('hotkeys') != new.get('hotkeys'):
+                try:
+                    self.hotkey_manager.reload_hotkeys()
+                except Exception as e:
+                    self.update_status(f"Warning: Could not register hotkeys - {str(e)}")
+                    return
+            self.update_status("Configuration reloaded")
+            
+        self.root.after(0, apply)
+        
     def update_status(self, message):
         """Update the status bar."""
         self.status_var.set(message)
@@ -192,22 +245,24 @@ class ShotuxApp:
         """Capture full screen screenshot."""
         self.update_status("Capturing full screen...")
         delay = int(self.delay_var.get())
+        until_stable = self.until_stable_var.get()
+        hide_window = delay > 0 or until_stable
         
         def capture():
             try:
-                if delay > 0:
+                if hide_window:
                     self.root.withdraw()  # Hide window during capture
-                    time.sleep(delay)
+                    self._wait_before_capture(delay, until_stable)
                     
                 screenshot = self.screenshot_manager.capture_fullscreen()
                 self.process_screenshot(screenshot)
                 
-                if delay > 0:
+                if hide_window:
                     self.root.deiconify()  # Show window again
                     
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to capture screenshot: {str(e)}")
-                if delay > 0:
+                if hide_window:
                     self.root.deiconify()
                     
         threading.Thread(target=capture, daemon=True).start()
@@ -216,11 +271,11 @@ class ShotuxApp:
         """Capture active window screenshot."""
         self.update_status("Capturing active window...")
         delay = int(self.delay_var.get())
+        until_stable = self.until_stable_var.get()
         
         def capture():
             try:
-                if delay > 0:
-                    time.sleep(delay)
+                self._wait_before_capture(delay, until_stable)
                     
                 screenshot = self.screenshot_manager.capture_window()
                 self.process_screenshot(screenshot)
@@ -234,11 +289,11 @@ class ShotuxApp:
         """Capture selected region screenshot."""
         self.update_status("Select region to capture...")
         delay = int(self.delay_var.get())
+        until_stable = self.until_stable_var.get()
         
         def capture():
             try:
-                if delay > 0:
-                    time.sleep(delay)
+                self._wait_before_capture(delay, until_stable)
                     
                 screenshot = self.screenshot_manager.capture_region()
                 if screenshot:
@@ -251,12 +306,26 @@ class ShotuxApp:
                 
         threading.Thread(target=capture, daemon=True).start()
         
+    def _wait_before_capture(self, delay, until_stable):
+        """Apply the configured delay or wait for the screen to settle."""
+        waited, stable = self.screenshot_manager.wait_before_capture(delay, until_stable)
+        if stable is not None:
+            state = "stable" if stable else "still changing"
+            self.update_status(f"Screen {state} after {waited:.2f}s (delay setting: {delay}s)")
+            
     def process_screenshot(self, screenshot):
         """Process and save/copy screenshot."""
         if not screenshot:
             return
             
         try:
+            # Apply configured redactions before anything leaves the app
+            screenshot = self.screenshot_manager.post_process(screenshot)
+            self.screenshot_manager.publish_frame(screenshot)
+            # Compress into history off the save/clipboard path
+            threading.Thread(target=self.capture_history.add, args=(screenshot,),
+                             daemon=True).start()
+            
             # Copy to clipboard if enabled
             if self.copy_clipboard_var.get():
                 self.screenshot_manager.copy_to_clipboard(screenshot)
@@ -268,11 +337,14 @@ class ShotuxApp:
                 if not os.path.exists(save_dir):
                     os.makedirs(save_dir, exist_ok=True)
                     
+                # Read the format once so a hot reload can't split name and encoding
+                image_format = self.config_manager.get('image_format', 'PNG')
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"screenshot_{timestamp}.png"
+                filename = f"screenshot_{timestamp}.{image_extension(image_format)}"
                 filepath = os.path.join(save_dir, filename)
                 
-                screenshot.save(filepath, "PNG")
+                self.screenshot_manager.save_screenshot(screenshot, filepath, image_format)
+                self.export_manager.submit(filepath)
                 self.update_status(f"Screenshot saved to {filepath}")
             elif not self.copy_clipboard_var.get():
                 # If neither auto-save nor clipboard, ask user where to save
@@ -286,7 +358,7 @@ class ShotuxApp:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = filedialog.asksaveasfilename(
             defaultextension=".png",
-            initialname=f"screenshot_{timestamp}.png",
+            initialfile=f"screenshot_{timestamp}.png",
             filetypes=[
                 ("PNG files", "*.png"),
                 ("JPEG files", "*.jpg"),
@@ -296,8 +368,30 @@ class ShotuxApp:
         
         if filename:
             screenshot.save(filename)
+            self.export_manager.submit(filename)
             self.update_status(f"Screenshot saved to {filename}")
             
+    def save_last(self):
+        """Save the most recent capture from history."""
+        if not len(self.capture_history):
+            messagebox.showinfo("Save Last", "No captures in history yet.")
+            return
+        try:
+            self.save_screenshot_as(self.capture_history.get(0))
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save screenshot: {str(e)}")
+        
+    def copy_last(self):
+        """Copy the most recent capture from history to the clipboard."""
+        if not len(self.capture_history):
+            messagebox.showinfo("Copy Last", "No captures in history yet.")
+            return
+        try:
+            self.screenshot_manager.copy_to_clipboard(self.capture_history.get(0))
+            self.update_status("Last screenshot copied to clipboard")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to copy screenshot: {str(e)}")
+            
     def browse_directory(self):
         """Browse for save directory."""
         directory = filedialog.askdirectory(initialdir=self.save_dir_var.get())
@@ -321,9 +415,10 @@ Keyboard Shortcuts:
 
 Features:
 • Multiple capture modes
-• Configurable delay
+• Configurable delay or wait until the screen is stable
 • Auto-save option
 • Copy to clipboard
+• Re-export recent captures (Save Last / Copy Last)
 • System tray integration
 
 For more information, visit the project repository.
@@ -338,18 +433,28 @@ For more information, visit the project repository.
         
     def on_closing(self):
         """Handle application closing."""
+        # Stop hot reload so our own save is not picked up again
+        self.config_manager.stop_watching()
+        
         # Save configuration
         config = {
             'delay': int(self.delay_var.get()),
             'auto_save': self.auto_save_var.get(),
             'copy_clipboard': self.copy_clipboard_var.get(),
-            'save_directory': self.save_dir_var.get()
+            'save_directory': self.save_dir_var.get(),
+            'until_stable': self.until_stable_var.get()
         }
         self.config_manager.save_config(config)
         
         # Cleanup hotkeys
         self.hotkey_manager.cleanup()
         
+        # Stop exports; unfinished ones stay queued on disk
+        self.export_manager.stop()
+        self.screenshot_manager.close_frame_ring()
+        self.history_server.stop()
+        self.metrics_exporter.stop()
+        
         # Close application
         self.root.quit()
         self.root.destroy()
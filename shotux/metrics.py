@@ -0,0 +1,320 @@
+"""
+Metrics Module
+Cheap always-on latency/throughput bookkeeping with Prometheus text export.
+"""
+
+import bisect
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import deque
+from pathlib import Path
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_SAMPLES = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+
+METRIC_HELP = {
+    'shotux_capture_seconds': ('histogram', 'Time taken to grab a frame, by backend.'),
+    'shotux_encode_seconds': ('histogram', 'Time taken to encode and write an image, by format.'),
+    'shotux_bytes_written_total': ('counter', 'Bytes of encoded images written to disk.'),
+    'shotux_failures_total': ('counter', 'Failed operations, by backend.'),
+    'shotux_queue_depth': ('gauge', 'Jobs waiting in a work queue.'),
+}
+
+
+class _Counter:
+    """A counter sharded per thread so increments never take a lock.
+
+    When a thread exits, its shard is folded into a base total, so short
+    lived threads do not leave shards behind.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+        self.shards = []
+        self.base = self._new_shard()
+        self.lock = threading.Lock()  # Only taken when a thread starts or exits
+
+    def _new_shard(self):
+        return [0]
+
+    def _shard(self):
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = self.local.shard = self._new_shard()
+            # The owner lives only in this thread's local storage, so it is
+            # collected when the thread exits
+            self.local.owner = owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, shard)
+            with self.lock:
+                self.shards.append(shard)
+        return shard
+
+    def _retire(self, shard):
+        """Fold a finished thread's shard into the base total."""
+        with self.lock:
+            for i, value in enumerate(shard):
+                self.base[i] += value
+            self.shards = [s for s in self.shards if s is not shard]
+
+    def _totals(self):
+        """Element-wise sum of the base and every live shard."""
+        with self.lock:
+            totals = list(self.base)
+            for shard in self.shards:
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return totals
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    def value(self):
+        """Sum over all thread shards."""
+        return self._totals()[0]
+
+
+class _ShardOwner:
+    """Weak-referenceable marker tying a shard to its thread."""
+
+
+class _Histogram(_Counter):
+    """Cumulative bucket counts plus a ring of recent samples for quantiles."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        super().__init__()
+        self.recent = deque(maxlen=RECENT_SAMPLES)  # append is atomic
+
+    def _new_shard(self):
+        # One count per bucket plus +Inf, followed by the running sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+        self.recent.append(value)
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, count, sum)."""
+        totals = self._totals()
+        cumulative = []
+        running = 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+    def quantiles(self):
+        """Quantiles over the most recent samples."""
+        samples = sorted(list(self.recent))
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in QUANTILES}
+
+
+class _Gauge:
+    """A single value that is simply overwritten."""
+
+    def __init__(self):
+        self.current = 0
+
+    def set(self, value):
+        self.current = value
+
+    def value(self):
+        return self.current
+
+
+class MetricsRegistry:
+    """Named, labelled metrics shared by every component in the process.
+
+    The hot path is a dict lookup plus an increment on a per-thread shard;
+    locks are only taken when a series or thread appears, when a thread
+    exits and while rendering.
+    """
+
+    def __init__(self):
+        self.series = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def _get(self, kind, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.series.get(key)
+        if metric is None:
+            with self.lock:
+                metric = self.series.get(key)
+                if metric is None:
+                    metric = self.series[key] = kind()
+        return metric
+
+    def metric(self, name, **labels):
+        """Return the series for a name and labels, or None if nothing was recorded."""
+        return self.series.get((name, tuple(sorted(labels.items()))))
+
+    def observe(self, name, value, **labels):
+        """Record a sample in a histogram."""
+        self._get(_Histogram, name, labels).observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        """Increase a counter."""
+        self._get(_Counter, name, labels).inc(amount)
+
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge to its current value."""
+        self._get(_Gauge, name, labels).set(value)
+
+    def render(self, **const_labels):
+        """Render every series in the Prometheus text exposition format.
+
+        const_labels (such as role='gui') are added to every sample.
+        """
+        const = tuple(sorted(const_labels.items()))
+        by_name = {}
+        for (name, labels), metric in sorted(list(self.series.items()), key=lambda item: item[0]):
+            by_name.setdefault(name, []).append((const + labels, metric))
+
+        lines = []
+        for name, series in by_name.items():
+            kind, help_text = METRIC_HELP.get(name, (None, name))
+            if kind is None:
+                kind = 'histogram' if isinstance(series[0][1], _Histogram) else \
+                    'counter' if isinstance(series[0][1], _Counter) else 'gauge'
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in series:
+                if isinstance(metric, _Histogram):
+                    lines.extend(self._render_histogram(name, labels, metric))
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_number(metric.value())}")
+            if kind == 'histogram':
+                lines.extend(self._render_recent(name, series))
+
+        lines.append("# HELP shotux_uptime_seconds Seconds since the process started recording.")
+        lines.append("# TYPE shotux_uptime_seconds gauge")
+        lines.append(f"shotux_uptime_seconds{_labels(const)} {_number(time.time() - self.started)}")
+        return '\n'.join(lines) + '\n'
+
+    def _render_recent(self, name, series):
+        """Render quantiles over recent samples as a companion gauge family."""
+        samples = []
+        for labels, metric in series:
+            for q, value in metric.quantiles().items():
+                samples.append(f"{name}_recent{_labels(labels + (('quantile', str(q)),))} "
+                               f"{_number(value)}")
+        if samples:
+            yield f"# HELP {name}_recent Quantiles of {name} over the last {RECENT_SAMPLES} samples."
+            yield f"# TYPE {name}_recent gauge"
+            yield from samples
+
+    def _render_histogram(self, name, labels, metric):
+        """Render bucket, sum and count samples for one histogram series."""
+        cumulative, count, total = metric.snapshot()
+        bounds = [_number(b) for b in metric.buckets] + ['+Inf']
+        for bound, value in zip(bounds, cumulative):
+            yield f"{name}_bucket{_labels(labels + (('le', bound),))} {value}"
+        yield f"{name}_sum{_labels(labels)} {_number(total)}"
+        yield f"{name}_count{_labels(labels)} {count}"
+
+
+def _labels(labels):
+    """Format a label tuple as {key="value",...}."""
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    """Format a sample value."""
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Process-wide registry used by all managers
+metrics = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Periodically rewrite a Prometheus textfile from the registry.
+
+    The file is replaced atomically so node_exporter's textfile collector
+    or shotux-cli --stats never read a partial write. Each role ('gui',
+    'batch') writes its own file and labels its samples with role, so a
+    GUI and a batch run never overwrite each other's metrics.
+    """
+
+    def __init__(self, config_manager, role, registry=None):
+        self.config_manager = config_manager
+        self.role = role
+        self.registry = registry or metrics
+        self.path = metrics_textfile_path(config_manager, role)
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start exporting if metrics are enabled."""
+        if self.thread or not self.config_manager.get('metrics.enabled', False):
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name='shotux-metrics', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Write a final snapshot and stop."""
+        if self.thread:
+            self.stopping.set()
+            self.thread.join(timeout=5)
+            self.thread = None
+            self.write()
+
+    def _run(self):
+        """Rewrite the textfile every metrics.interval seconds."""
+        while True:
+            self.write()
+            if self.stopping.wait(self.config_manager.get('metrics.interval', 15)):
+                return
+
+    def write(self):
+        """Write the current metrics to the textfile."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.metrics', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.registry.render(role=self.role))
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Warning: Failed to write metrics: {e}")
+
+
+def metrics_textfile_path(config_manager, role):
+    """Location of the Prometheus textfile written by one role.
+
+    metrics.textfile (default metrics.prom in the config directory) is the
+    base name; the role is appended to the stem, e.g. metrics-gui.prom.
+    """
+    base = _textfile_base(config_manager)
+    return base.with_name(f"{base.stem}-{role}{base.suffix}")
+
+
+def metrics_textfiles(config_manager):
+    """Every role's textfile that currently exists."""
+    base = _textfile_base(config_manager)
+    if not base.parent.exists():
+        return []
+    return sorted(base.parent.glob(f"{base.stem}-*{base.suffix}"))
+
+
+def _textfile_base(config_manager):
+    path = config_manager.get('metrics.textfile')
+    if path:
+        return Path(path).expanduser()
+    return Path(config_manager.config_dir) / 'metrics.prom'
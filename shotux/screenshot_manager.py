@@ -6,21 +6,95 @@ Handles all screenshot capture operations.
 import subprocess
 import tempfile
 import os
-from PIL import Image, ImageGrab
+import time
+from PIL import Image, ImageChops, ImageGrab
 from io import BytesIO
 import tkinter as tk
 
+from .annotations import apply_annotations
+from .frame_ring import DEFAULT_MAX_FRAME_BYTES, FramePublisher
+from .metrics import metrics
+from .stitching import StripWriter, find_overlap, row_hashes
+
 
 class ScreenshotManager:
     def __init__(self, config_manager):
         self.config_manager = config_manager
         self.temp_files = []
+        self.frame_publisher = None
+        self.frame_ring_failed = False
+        
+    def wait_before_capture(self, delay=0, until_stable=False, bbox=None):
+        """Wait before a capture, either a fixed delay or until the screen settles.
+        
+        Returns a (waited_seconds, stable) tuple. ``stable`` is None when a
+        plain delay was used.
+        """
+        if not until_stable:
+            if delay > 0:
+                time.sleep(delay)
+            return delay, None
+            
+        return self.wait_until_stable(bbox=bbox, delay=delay)
+        
+    def wait_until_stable(self, bbox=None, stable_ms=None, timeout=None, delay=0):
+        """Block until the screen content in bbox stops changing.
+        
+        Samples cheap downscaled grayscale frames and compares them with
+        ImageChops, returning as soon as no sample has changed for stable_ms
+        milliseconds or timeout seconds have passed. Returns a
+        (waited_seconds, stable) tuple.
+        
+        Where the screen cannot be sampled (e.g. ImageGrab on Wayland) it
+        warns and falls back to the fixed delay, returning stable as None.
+        """
+        if stable_ms is None:
+            stable_ms = self.config_manager.get('stability.stable_ms', 300)
+        if timeout is None:
+            timeout = self.config_manager.get('stability.timeout', 10)
+        interval = self.config_manager.get('stability.sample_interval', 0.02)
+        threshold = self.config_manager.get('stability.threshold', 2)
+        
+        start = time.monotonic()
+        stable_since = start
+        try:
+            previous = self._sample_frame(bbox)
+            while True:
+                time.sleep(interval)
+                frame = self._sample_frame(bbox)
+                now = time.monotonic()
+                if self._frame_changed(previous, frame, threshold):
+                    stable_since = now
+                elif (now - stable_since) * 1000 >= stable_ms:
+                    return now - start, True
+                if now - start >= timeout:
+                    return now - start, False
+                previous = frame
+        except Exception as e:
+            print(f"Warning: Cannot sample screen ({e}); using the {delay}s delay instead")
+            time.sleep(max(0, delay - (time.monotonic() - start)))
+            return time.monotonic() - start, None
+            
+    def _sample_frame(self, bbox=None):
+        """Grab a downscaled grayscale frame used for change detection."""
+        factor = max(1, int(self.config_manager.get('stability.downscale', 8)))
+        frame = ImageGrab.grab(bbox=bbox)
+        if factor > 1:
+            frame = frame.reduce(factor)
+        return frame.convert('L')
+        
+    def _frame_changed(self, previous, frame, threshold):
+        """Check whether any sampled pixel moved by more than threshold."""
+        if previous.size != frame.size:
+            return True
+        diff = ImageChops.difference(previous, frame)
+        return diff.getextrema()[1] > threshold
         
     def capture_fullscreen(self):
         """Capture full screen using available methods."""
         try:
             # Try using PIL ImageGrab first (works with X11)
-            screenshot = ImageGrab.grab()
+            screenshot = self._grab()
             return screenshot
         except Exception:
             # Fallback to scrot command
@@ -41,8 +115,205 @@ class ScreenshotManager:
         except Exception as e:
             raise Exception(f"Failed to capture region: {str(e)}")
             
-    def _capture_with_scrot(self, mode):
-        """Capture screenshot using scrot command."""
+    def capture_geometry(self, x, y, width, height):
+        """Capture a fixed screen rectangle without interactive selection."""
+        if width <= 0 or height <= 0:
+            raise ValueError(f"Invalid capture geometry: {width}x{height}")
+        try:
+            return self._grab(bbox=(x, y, x + width, y + height))
+        except Exception:
+            return self._capture_with_scrot("geometry", geometry=(x, y, width, height))
+            
+    def capture_window_id(self, window_id):
+        """Capture a window by its X11 window id."""
+        try:
+            return self.capture_geometry(*self._window_geometry(window_id))
+        except Exception as e:
+            raise Exception(f"Failed to capture window {window_id}: {str(e)}")
+            
+    def capture_scrolling(self, x, y, width, height, max_frames=None, scroll_clicks=None):
+        """Capture content taller than the screen by scrolling a region.
+        
+        Repeatedly captures the region while sending wheel-down clicks,
+        finds the vertical overlap between consecutive frames from row
+        hashes and stitches the new rows into one tall image. Stops when
+        scrolling no longer reveals new content or max_frames is reached.
+        """
+        if max_frames is None:
+            max_frames = self.config_manager.get('scrolling.max_frames', 50)
+        if scroll_clicks is None:
+            scroll_clicks = self.config_manager.get('scrolling.scroll_clicks', 5)
+        settle = self.config_manager.get('scrolling.settle_ms', 150) / 1000
+        min_overlap = self.config_manager.get('scrolling.min_overlap', 8)
+        
+        # Each step scrolls by the same amount, so the previous overlap is
+        # the best hint for repeating content; pixels_per_click seeds it
+        expected = None
+        pixels_per_click = self.config_manager.get('scrolling.pixels_per_click')
+        if pixels_per_click:
+            expected = max(0, height - scroll_clicks * pixels_per_click)
+        
+        frame = self.capture_geometry(x, y, width, height).convert('RGB')
+        writer = StripWriter(frame.width)
+        try:
+            writer.append(frame)
+            previous = row_hashes(frame)
+            for _ in range(max_frames - 1):
+                self._scroll(x + width // 2, y + height // 2, scroll_clicks)
+                time.sleep(settle)
+                frame = self.capture_geometry(x, y, width, height).convert('RGB')
+                current = row_hashes(frame)
+                if current == previous:
+                    break  # Nothing new came into view
+                overlap = find_overlap(previous, current, min_overlap, expected)
+                if overlap and len(set(current[:overlap])) >= min_overlap:
+                    expected = overlap  # Only learn from overlaps that were unambiguous
+                writer.append(frame.crop((0, overlap, frame.width, frame.height)))
+                previous = current
+            return writer.finish()
+        except Exception as e:
+            writer.close()
+            raise Exception(f"Failed to capture scrolling region: {str(e)}")
+            
+    def _scroll(self, x, y, clicks):
+        """Send wheel-down clicks at a screen position through XTest (xdotool)."""
+        cmd = ['xdotool', 'mousemove', str(x), str(y),
+               'click', '--repeat', str(clicks), '--delay', '10', '5']
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        except FileNotFoundError:
+            raise Exception("xdotool is not installed. Please install it using: sudo apt install xdotool")
+        if result.returncode != 0:
+            raise Exception(f"xdotool failed: {result.stderr.strip()}")
+            
+    def _grab(self, bbox=None):
+        """Grab with PIL ImageGrab, recording latency and failures."""
+        started = time.perf_counter()
+        try:
+            screenshot = ImageGrab.grab(bbox=bbox)
+        except Exception:
+            metrics.inc('shotux_failures_total', backend='imagegrab')
+            raise
+        metrics.observe('shotux_capture_seconds', time.perf_counter() - started, backend='imagegrab')
+        return screenshot
+        
+    def _window_geometry(self, window_id):
+        """Look up the absolute geometry of a window using xwininfo."""
+        try:
+            result = subprocess.run(['xwininfo', '-id', str(window_id)],
+                                    capture_output=True, text=True, timeout=5)
+        except FileNotFoundError:
+            raise Exception("xwininfo is not installed. Please install it using: sudo apt install x11-utils")
+        if result.returncode != 0:
+            raise Exception(f"xwininfo failed: {result.stderr.strip()}")
+            
+        fields = {}
+        for line in result.stdout.splitlines():
+            key, sep, value = line.strip().partition(':')
+            if sep:
+                fields[key] = value.strip()
+        try:
+            return (int(fields['Absolute upper-left X']),
+                    int(fields['Absolute upper-left Y']),
+                    int(fields['Width']),
+                    int(fields['Height']))
+        except (KeyError, ValueError):
+            raise Exception("Could not parse window geometry from xwininfo")
+            
+    def post_process(self, image, annotations=None):
+        """Apply redactions and annotations before the image leaves the app.
+        
+        Uses the configured 'annotations' spec when none is given.
+        """
+        if annotations is None:
+            annotations = self.config_manager.get('annotations', [])
+        if not annotations:
+            return image
+        try:
+            return apply_annotations(image, annotations)
+        except Exception as e:
+            raise Exception(f"Failed to apply annotations: {str(e)}")
+            
+    def publish_frame(self, image):
+        """Publish raw pixels to the shared-memory frame ring when enabled.
+        
+        Returns the frame's sequence number, or None if publishing is off or
+        failed. Publishing is a side channel, so errors are only logged and
+        never stop the capture from being saved or copied.
+        """
+        if not self.config_manager.get('shared_memory.enabled', False) or self.frame_ring_failed:
+            return None
+        try:
+            frame_bytes = image.width * image.height * (1 if image.mode == 'L' else
+                                                        3 if image.mode == 'RGB' else 4)
+            if self.frame_publisher and frame_bytes > self.frame_publisher.capacity:
+                # Bigger than any frame so far (e.g. a scrolling capture); clients
+                # see the old ring as retired and reattach to the new one
+                self.close_frame_ring()
+            if self.frame_publisher is None:
+                max_frame_bytes = max(self.config_manager.get('shared_memory.max_frame_bytes', 0)
+                                      or DEFAULT_MAX_FRAME_BYTES, frame_bytes)
+                self.frame_publisher = FramePublisher(
+                    name=self.config_manager.get('shared_memory.name', 'shotux-frames'),
+                    slots=self.config_manager.get('shared_memory.slots', 3),
+                    max_frame_bytes=max_frame_bytes)
+            return self.frame_publisher.publish(image)
+        except FileExistsError as e:
+            # Another live process owns the ring; don't retry for every capture
+            self.frame_ring_failed = True
+            print(f"Warning: Shared-memory publishing disabled: {e}")
+        except Exception as e:
+            metrics.inc('shotux_failures_total', backend='shared-memory')
+            print(f"Warning: Failed to publish frame: {e}")
+        return None
+            
+    def close_frame_ring(self):
+        """Remove the shared-memory frame ring if one was created."""
+        if self.frame_publisher:
+            self.frame_publisher.close()
+            self.frame_publisher = None
+            
+    def save_screenshot(self, image, filepath, image_format=None):
+        """Save an image using the configured format and quality."""
+        image_format = (image_format or self.config_manager.get('image_format', 'PNG')).upper()
+        if image_format == 'JPG':
+            image_format = 'JPEG'
+        Image.init()
+        if image_format not in Image.SAVE:
+            raise ValueError(f"Unknown image format {image_format!r}")
+        options = {}
+        if image_format in ('JPEG', 'WEBP'):
+            options['quality'] = self.config_manager.get('image_quality', 95)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        started = time.perf_counter()
+        try:
+            image.save(filepath, image_format, **options)
+        except Exception:
+            metrics.inc('shotux_failures_total', backend='encode')
+            raise
+        metrics.observe('shotux_encode_seconds', time.perf_counter() - started, format=image_format)
+        metrics.inc('shotux_bytes_written_total', os.path.getsize(filepath))
+        return filepath
+        
+    def _capture_with_scrot(self, mode, geometry=None):
+        """Capture screenshot using scrot command, recording latency and failures.
+        
+        Window and region captures wait for the user to click or drag with
+        scrot -s, so they are left out of the latency histogram.
+        """
+        started = time.perf_counter()
+        try:
+            screenshot = self._run_scrot(mode, geometry)
+        except Exception:
+            metrics.inc('shotux_failures_total', backend='scrot')
+            raise
+        if screenshot is not None and mode not in ('window', 'region'):
+            metrics.observe('shotux_capture_seconds', time.perf_counter() - started, backend='scrot')
+        return screenshot
+        
+    def _run_scrot(self, mode, geometry=None):
+        """Run scrot and load the image it wrote."""
         # Create temporary file
         temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
         temp_file.close()
@@ -58,6 +329,9 @@ class ScreenshotManager:
             elif mode == "region":
                 # Capture selected region
                 cmd = ['scrot', '-s', temp_file.name]
+            elif mode == "geometry":
+                # Capture a fixed rectangle
+                cmd = ['scrot', '-a', ','.join(str(v) for v in geometry), temp_file.name]
             else:
                 raise ValueError(f"Unknown capture mode: {mode}")
                 
@@ -124,3 +398,9 @@ class ScreenshotManager:
     def __del__(self):
         """Cleanup when object is destroyed."""
         self.cleanup_temp_files()
+        self.close_frame_ring()
+
+
+def image_extension(image_format):
+    """File extension for a Pillow format name ('JPEG' -> 'jpg')."""
+    return 'jpg' if image_format.upper() in ('JPEG', 'JPG') else image_format.lower()
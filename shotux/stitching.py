@@ -0,0 +1,115 @@
+"""
+Stitching Module
+Overlap detection and incremental stitching for scrolling captures.
+"""
+
+import os
+import tempfile
+
+from PIL import Image
+
+
+def row_hashes(image):
+    """Hash every pixel row of an image.
+
+    Rows are hashed straight from the raw buffer through memoryview slices,
+    so no per-row copies or per-pixel Python work is needed.
+    """
+    data = image.tobytes()
+    row_size = len(data) // image.height if image.height else 0
+    view = memoryview(data)
+    return [hash(view[offset:offset + row_size])
+            for offset in range(0, row_size * image.height, row_size)]
+
+
+def find_overlap(previous, current, min_overlap=8, expected=None):
+    """Find how many rows at the top of current repeat the bottom of previous.
+
+    Both arguments are lists of row hashes. Candidate offsets come from the
+    previous frame's rows that match the first row of the current frame,
+    and each candidate is verified with a single list comparison.
+
+    Several offsets can verify: blank gaps between lines of text match
+    almost anywhere, and repeating content (lists, tables) matches at every
+    period. Candidates whose overlap has fewer than min_overlap distinct
+    rows carry too little information to be trusted and are only used when
+    nothing better verified. Among the rest, the candidate closest to the
+    expected overlap is chosen when one is given; otherwise the smallest
+    wins, which may duplicate rows but never silently drops them. Returns 0
+    when no overlap of at least min_overlap rows was found.
+    """
+    if not previous or not current:
+        return 0
+
+    first = current[0]
+    height = len(previous)
+    candidates = []
+    weak = []
+    for start, value in enumerate(previous):
+        if value != first:
+            continue
+        overlap = height - start
+        if overlap > len(current):
+            continue
+        if overlap < min_overlap:
+            break
+        if previous[start:] == current[:overlap]:
+            if len(set(current[:overlap])) >= min_overlap:
+                candidates.append(overlap)
+            else:
+                weak.append(overlap)
+
+    if not candidates:
+        if not weak:
+            return 0
+        # Only uniform rows (e.g. whitespace) matched; the largest overlap
+        # can only lose rows that look exactly like the ones kept
+        candidates = weak if expected is not None else [max(weak)]
+    if expected is None:
+        return min(candidates)
+    return min(candidates, key=lambda overlap: (abs(overlap - expected), overlap))
+
+
+class StripWriter:
+    """Append image strips to a raw spill file and assemble them at the end.
+
+    Strips are written to disk as soon as they are captured, so a long
+    scrolling capture only keeps the current frames in memory until the
+    final image is built.
+    """
+
+    def __init__(self, width, mode='RGB'):
+        self.width = width
+        self.mode = mode
+        self.height = 0
+        spill = tempfile.NamedTemporaryFile(prefix='shotux-scroll-', suffix='.raw', delete=False)
+        self.path = spill.name
+        self.file = spill
+
+    def append(self, strip):
+        """Append a strip, converting it to the writer's mode if needed."""
+        if strip.width != self.width:
+            raise ValueError(f"Strip width {strip.width} does not match {self.width}")
+        if strip.mode != self.mode:
+            strip = strip.convert(self.mode)
+        self.file.write(strip.tobytes())
+        self.height += strip.height
+
+    def finish(self):
+        """Build the stitched image and remove the spill file."""
+        try:
+            self.file.close()
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            return Image.frombytes(self.mode, (self.width, self.height), data)
+        finally:
+            self.close()
+
+    def close(self):
+        """Close and delete the spill file."""
+        try:
+            self.file.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        except Exception:
+            pass  # Ignore cleanup errors
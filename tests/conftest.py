@@ -0,0 +1,27 @@
+"""
+Shared test fixtures.
+"""
+
+import pytest
+
+
+class FakeConfig:
+    """A stand-in for ConfigManager holding flat dotted keys."""
+
+    def __init__(self, config_dir, values):
+        self.config_dir = str(config_dir)
+        self.values = values
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Build a FakeConfig from a dict of dotted keys and/or keyword values.
+
+    config_dir points at the test's tmp_path.
+    """
+    def make(values=None, **more):
+        return FakeConfig(tmp_path, {**(values or {}), **more})
+    return make
@@ -0,0 +1,123 @@
+"""
+Tests for redactions and annotations applied before a capture leaves the app.
+"""
+
+import io
+import json
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from shotux.annotations import apply_annotations, load_annotation_spec
+from shotux.batch_runner import BatchRunner
+from shotux.config_manager import freeze
+from shotux.screenshot_manager import ScreenshotManager
+
+
+def noise(size):
+    return Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+
+
+def colors(image):
+    return {color for _, color in image.getcolors(image.width * image.height)}
+
+
+def outside(before, after, box):
+    """Pixels outside an (x, y, w, h) box, with the box blanked in both images."""
+    x, y, width, height = box
+    before, after = before.copy(), after.copy()
+    for image in (before, after):
+        image.paste((0, 0, 0), (x, y, x + width, y + height))
+    return before.tobytes(), after.tobytes()
+
+
+@pytest.mark.parametrize('operation', [
+    {'type': 'pixelate', 'box': [20, 30, 50, 40], 'block': 8},
+    {'type': 'blur', 'box': [20, 30, 50, 40], 'radius': 4},
+])
+def test_redaction_only_touches_its_region(operation):
+    image = noise((160, 120))
+    result = apply_annotations(image.copy(), [operation])
+    region = (20, 30, 70, 70)
+    assert result.crop(region).tobytes() != image.crop(region).tobytes()
+    before, after = outside(image, result, operation['box'])
+    assert before == after
+
+
+def test_pixelate_makes_uniform_blocks():
+    result = apply_annotations(noise((64, 64)), [{'type': 'pixelate', 'box': [0, 0, 32, 32],
+                                                  'block': 16}])
+    block = result.crop((0, 0, 16, 16))
+    assert len(colors(block)) == 1
+
+
+def test_boxes_partly_off_screen_are_clipped():
+    image = noise((100, 80))
+    result = apply_annotations(image.copy(), [
+        {'type': 'blur', 'box': [-20, -20, 50, 50]},
+        {'type': 'pixelate', 'box': [80, 60, 100, 100]},
+        {'type': 'rect', 'box': [-5, 70, 20, 40], 'fill': 'black'},
+        {'type': 'blur', 'box': [500, 500, 10, 10]},  # Entirely off-screen
+    ])
+    assert result.size == image.size
+    assert result.crop((0, 0, 30, 30)).tobytes() != image.crop((0, 0, 30, 30)).tobytes()
+    assert result.crop((80, 60, 100, 80)).tobytes() != image.crop((80, 60, 100, 80)).tobytes()
+    assert result.getpixel((5, 75)) == (0, 0, 0)
+
+
+def test_unknown_type_fails_closed():
+    with pytest.raises(ValueError):
+        apply_annotations(noise((10, 10)), [{'type': 'smudge', 'box': [0, 0, 5, 5]}])
+
+
+def test_load_spec_from_json_and_file(tmp_path):
+    spec = [{'type': 'blur', 'box': [0, 0, 10, 10]}]
+    assert load_annotation_spec(json.dumps(spec)) == spec
+    path = tmp_path / 'spec.json'
+    path.write_text(json.dumps({'annotations': spec}))
+    assert load_annotation_spec(str(path)) == spec
+    with pytest.raises(Exception):
+        load_annotation_spec('{"annotations": 3}')
+
+
+def test_configured_redactions_apply_to_every_capture(make_config):
+    spec = freeze([{'type': 'rect', 'box': [0, 0, 10, 10], 'fill': 'black', 'outline': 'black'}])
+    manager = ScreenshotManager(make_config(annotations=spec))
+    result = manager.post_process(noise((40, 40)))
+    assert colors(result.crop((0, 0, 10, 10))) == {(0, 0, 0)}
+
+
+def test_batch_saves_only_redacted_pixels(tmp_path, make_config, monkeypatch):
+    manager = ScreenshotManager(make_config())
+    capture = noise((64, 48))
+    monkeypatch.setattr(manager, 'capture_fullscreen', lambda: capture.copy())
+    jobs = [
+        {'output': str(tmp_path / 'ok.png'),
+         'annotate': [{'type': 'rect', 'box': [0, 0, 64, 48], 'fill': 'black', 'outline': 'black'}]},
+        {'output': str(tmp_path / 'bad.png'), 'annotate': [{'type': 'smudge'}]},
+    ]
+    out = io.StringIO()
+    failures = BatchRunner(manager, make_config(), workers=1, out=out).run_lines(
+        json.dumps(job) for job in jobs)
+
+    assert failures == 1
+    assert colors(Image.open(tmp_path / 'ok.png').convert('RGB')) == {(0, 0, 0)}
+    assert not (tmp_path / 'bad.png').exists()  # A broken spec never writes the raw capture
+
+
+def test_dozens_of_redactions_on_4k_frame_are_fast():
+    image = Image.new('RGB', (3840, 2160), (30, 60, 90))
+    spec = []
+    for i in range(48):
+        kind = 'blur' if i % 2 else 'pixelate'
+        spec.append({'type': kind, 'box': [(i % 8) * 470, (i // 8) * 350, 240, 60]})
+    best = min(_timed(apply_annotations, image, spec) for _ in range(3))
+    assert best < 0.25  # Typically a few milliseconds; generous for slow CI
+
+
+def _timed(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
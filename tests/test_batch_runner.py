@@ -0,0 +1,124 @@
+"""
+Tests for scripted batch capture jobs.
+"""
+
+import io
+import json
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from shotux.batch_runner import BatchRunner, parse_geometry
+from shotux.screenshot_manager import ScreenshotManager
+
+
+class StubScreenshots:
+    """Captures blank images and records saves instead of touching the screen."""
+
+    def __init__(self, save_gate=None):
+        self.captures = 0
+        self.saved = []
+        self.save_gate = save_gate
+        self.lock = threading.Lock()
+
+    def capture_fullscreen(self):
+        self.captures += 1
+        return Image.new('RGB', (32, 24))
+
+    def capture_geometry(self, x, y, width, height):
+        self.captures += 1
+        return Image.new('RGB', (width, height))
+
+    def capture_window(self):
+        raise Exception("no active window")
+
+    def post_process(self, image, annotations=None):
+        return image
+
+    def publish_frame(self, image):
+        return None
+
+    def save_screenshot(self, image, filepath, image_format=None):
+        if self.save_gate:
+            self.save_gate.wait(10)
+        with self.lock:
+            self.saved.append((filepath, image_format))
+
+
+def run(runner, jobs):
+    out = io.StringIO()
+    runner.out = out
+    lines = [job if isinstance(job, str) else json.dumps(job) for job in jobs]
+    failures = runner.run_lines(lines)
+    return failures, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize('geometry, expected', [
+    ('800x600+10+20', (10, 20, 800, 600)),
+    ('10,20,800,600', (10, 20, 800, 600)),
+    ([10, 20, 800, 600], (10, 20, 800, 600)),
+    ({'x': 10, 'y': 20, 'width': 800, 'height': 600}, (10, 20, 800, 600)),
+])
+def test_parse_geometry_forms(geometry, expected):
+    assert parse_geometry(geometry) == expected
+
+
+@pytest.mark.parametrize('geometry', ['800x600', '800x600-10+5', 'a,b,c,d', [1, 2, 3],
+                                      {'x': 1}, '0x600+0+0'])
+def test_parse_geometry_names_bad_input(geometry):
+    with pytest.raises(ValueError, match='Invalid geometry'):
+        parse_geometry(geometry)
+
+
+def test_batch_continues_past_failures(tmp_path, make_config):
+    screenshots = StubScreenshots()
+    runner = BatchRunner(screenshots, make_config(save_directory=str(tmp_path)), workers=2)
+    failures, statuses = run(runner, [
+        {'mode': 'fullscreen', 'output': str(tmp_path / 'a.png')},
+        'not json',
+        {'mode': 'teleport'},
+        {'mode': 'window'},
+        {'mode': 'scrolling'},
+        {'mode': 'region', 'geometry': '800x600'},
+        '# comment',
+        {'mode': 'region', 'geometry': '40x30+5+5', 'format': 'JPEG'},
+    ])
+
+    assert failures == 5
+    by_job = {status['job']: status for status in statuses}
+    assert sorted(by_job) == [1, 2, 3, 4, 5, 6, 8]
+    assert by_job[1]['status'] == 'ok' and by_job[8]['status'] == 'ok'
+    assert by_job[8]['output'].endswith('.jpg') and by_job[8]['width'] == 40
+    assert "Unknown capture mode" in by_job[3]['error']
+    assert "require a 'geometry'" in by_job[5]['error']
+    assert "Invalid geometry '800x600'" in by_job[6]['error']
+
+
+def test_unknown_format_is_reported_clearly(tmp_path, make_config, monkeypatch):
+    screenshots = ScreenshotManager(make_config())
+    monkeypatch.setattr(screenshots, 'capture_fullscreen', lambda: Image.new('RGB', (8, 8)))
+    runner = BatchRunner(screenshots, make_config(), workers=1)
+    failures, statuses = run(runner, [{'output': str(tmp_path / 'a.xyz'), 'format': 'XYZ'}])
+    assert failures == 1
+    assert statuses[0]['error'] == "Unknown image format 'XYZ'"
+
+
+def test_encodes_apply_backpressure(tmp_path, make_config):
+    gate = threading.Event()
+    screenshots = StubScreenshots(save_gate=gate)
+    runner = BatchRunner(screenshots, make_config(save_directory=str(tmp_path)), workers=1)
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(zip(
+        ('failures', 'statuses'), run(runner, [{'mode': 'fullscreen'}] * 10))))
+    worker.start()
+    time.sleep(0.3)
+    # Encodes are stuck, so capturing must stop once 2 x workers are queued
+    assert screenshots.captures <= 2
+    gate.set()
+    worker.join(10)
+
+    assert result['failures'] == 0
+    assert screenshots.captures == 10
+    assert len(screenshots.saved) == 10
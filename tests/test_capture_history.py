@@ -0,0 +1,58 @@
+"""
+Tests for the in-memory capture history and its CLI server.
+"""
+
+import pytest
+from PIL import Image
+
+from shotux.capture_history import CaptureHistory, HistoryServer
+
+
+class FakeScreenshots:
+    def __init__(self):
+        self.saved = []
+
+    def save_screenshot(self, image, path, image_format=None):
+        self.saved.append((path, image_format, image.size))
+
+
+@pytest.fixture
+def make_server(tmp_path, make_config):
+    """A history server holding three captures, 10, 20 and 30 pixels wide."""
+    def make(**values):
+        config = make_config({'save_directory': str(tmp_path),
+                              'history.socket': str(tmp_path / 's')}, **values)
+        history = CaptureHistory(config)
+        for width in (10, 20, 30):
+            history.add(Image.new('RGB', (width, 5)))
+        screenshots = FakeScreenshots()
+        return HistoryServer(history, screenshots, config), screenshots
+    return make
+
+
+def test_history_round_trip_most_recent_first(make_server):
+    server, _ = make_server()
+    assert [c['width'] for c in server.history.describe()] == [30, 20, 10]
+    assert server.history.get(1).size == (20, 5)
+
+
+def test_save_uses_extension_of_format(tmp_path, make_server):
+    server, screenshots = make_server(image_format='JPEG')
+    paths = server.handle({'action': 'save', 'count': 2})['files']
+    assert all(path.endswith('.jpg') for path in paths)
+    assert [saved[1:] for saved in screenshots.saved] == [('JPEG', (30, 5)), ('JPEG', (20, 5))]
+
+
+def test_save_several_into_directory(tmp_path, make_server):
+    server, _ = make_server()
+    target = tmp_path / 'out'
+    paths = server.handle({'action': 'save', 'count': 3, 'directory': str(target),
+                           'format': 'png'})['files']
+    assert len(paths) == 3
+    assert all(path.startswith(str(target)) and path.endswith('.png') for path in paths)
+
+
+def test_output_file_with_several_captures_is_rejected(tmp_path, make_server):
+    server, _ = make_server()
+    with pytest.raises(ValueError):
+        server.handle({'action': 'save', 'count': 2, 'output': str(tmp_path / 'a.png')})
@@ -0,0 +1,62 @@
+"""
+Tests for config snapshots, saving and hot reload.
+"""
+
+import json
+import os
+import stat
+
+import pytest
+
+from shotux.config_manager import ConfigManager
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    return tmp_path
+
+
+def write_file(manager, config):
+    manager.config_dir.mkdir(parents=True, exist_ok=True)
+    with open(manager.config_file, 'w') as f:
+        json.dump(config, f)
+
+
+def test_overrides_survive_reload(home):
+    manager = ConfigManager()
+    manager.set('shared_memory.enabled', True)
+    write_file(manager, {'delay': 3})
+
+    assert manager.reload()
+    assert manager.get('delay') == 3
+    assert manager.get('shared_memory.enabled') is True
+    assert manager.get('shared_memory.slots') == 3
+
+
+def test_save_merges_into_current_file(home):
+    manager = ConfigManager()
+    manager.set('shared_memory.enabled', True)
+    write_file(manager, {'image_format': 'JPEG', 'ui': {'theme': 'light'}})  # Saved elsewhere
+
+    manager.save_config({'delay': 5, 'ui': {'window_width': 900}})
+
+    with open(manager.config_file) as f:
+        saved = json.load(f)
+    assert saved['delay'] == 5
+    assert saved['image_format'] == 'JPEG'
+    assert saved['ui']['theme'] == 'light'
+    assert saved['ui']['window_width'] == 900
+    assert saved['shared_memory']['enabled'] is False  # Overrides are not persisted
+    assert manager.get('shared_memory.enabled') is True
+
+
+def test_save_keeps_file_mode(home):
+    manager = ConfigManager()
+    write_file(manager, {})
+    os.chmod(manager.config_file, 0o640)
+
+    manager.save_config({'delay': 1})
+
+    assert stat.S_IMODE(os.stat(manager.config_file).st_mode) == 0o640
+    assert not [name for name in os.listdir(manager.config_dir) if name.endswith('.tmp')]
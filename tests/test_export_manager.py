@@ -0,0 +1,163 @@
+"""
+Tests for the background export queue.
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shotux.export_manager import ExportManager
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, self.client_address[1], len(body)))
+            fail = server.failures_left > 0
+            if fail:
+                server.failures_left -= 1
+        self.send_response(503 if fail else 200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upload_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), UploadHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.failures_left = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def make_files(directory, count):
+    paths = []
+    for i in range(count):
+        path = directory / f"shot{i}.png"
+        path.write_bytes(os.urandom(1024))
+        paths.append(path)
+    return paths
+
+
+def test_http_retries_503_and_reuses_connection(tmp_path, upload_server, make_config):
+    url = f"http://127.0.0.1:{upload_server.server_port}/upload/{{name}}"
+    config = make_config({
+        'exports': [{'type': 'http', 'url': url}],
+        'export.concurrency': 1,
+        'export.retry_backoff': 0.05,
+    })
+    upload_server.failures_left = 1
+    manager = ExportManager(config)
+    try:
+        for path in make_files(tmp_path, 3):
+            manager.submit(str(path))
+        assert wait_for(lambda: not list(manager.queue_dir.glob('*.json'))
+                        and not list(manager.queue_dir.glob('*.running')))
+    finally:
+        manager.stop()
+
+    paths = [path for path, _, _ in upload_server.requests]
+    assert len(paths) == 4  # One 503 plus three successful uploads
+    assert sorted(set(paths)) == ['/upload/shot0.png', '/upload/shot1.png', '/upload/shot2.png']
+    ports = {port for _, port, _ in upload_server.requests}
+    assert len(ports) == 1  # Every request went over the same keep-alive connection
+    assert not list(manager.queue_dir.glob('*.failed'))
+
+
+def test_two_managers_share_queue_without_duplicates(tmp_path, make_config):
+    log = tmp_path / 'exported.log'
+    command = f"{sys.executable} -c \"import sys; open(sys.argv[1], 'a').write(sys.argv[2] + '\\n')\" {log} {{name}}"
+    config = make_config(exports=[{'type': 'command', 'command': command}])
+
+    first = ExportManager(config)
+    second = ExportManager(config)
+    first.queue_dir.mkdir(parents=True)
+    files = make_files(tmp_path, 12)
+    for path in files:
+        for target in first.targets():
+            first._write_job({'id': f"{time.time():.6f}-{path.stem}", 'file': str(path),
+                              'target': target, 'attempts': 0, 'next_attempt': 0})
+    try:
+        first.start()
+        second.start()
+        assert wait_for(lambda: log.exists() and len(log.read_text().splitlines()) >= len(files))
+        time.sleep(0.2)
+    finally:
+        first.stop()
+        second.stop()
+
+    names = log.read_text().splitlines()
+    assert sorted(names) == sorted(path.name for path in files)
+    assert not list(first.queue_dir.iterdir())
+
+
+def test_stale_claims_are_recovered(make_config):
+    config = make_config(exports=[])
+    manager = ExportManager(config)
+    manager.queue_dir.mkdir(parents=True)
+    dead_pid = 2 ** 22 + 1  # Above the default pid_max
+    stale = manager.queue_dir / f"1.5-abc.{dead_pid}.running"
+    stale.write_text('{}')
+    live = manager.queue_dir / f"2.5-def.{os.getpid()}.running"
+    live.write_text('{}')
+
+    manager._recover_claims()
+
+    assert (manager.queue_dir / '1.5-abc.json').exists()
+    assert live.exists()
+
+
+def test_flush_reports_jobs_waiting_for_retry(tmp_path, upload_server, make_config):
+    url = f"http://127.0.0.1:{upload_server.server_port}/upload/{{name}}"
+    config = make_config({'exports': [{'type': 'http', 'url': url}],
+                          'export.retry_backoff': 60})
+    upload_server.failures_left = 100
+    manager = ExportManager(config)
+    try:
+        manager.submit(str(make_files(tmp_path, 1)[0]))
+        assert manager.flush(timeout=5) is False
+        assert manager.pending() == 1
+    finally:
+        manager.stop()
+    assert len(list(manager.queue_dir.glob('*.json'))) == 1
+
+
+def test_finished_jobs_do_not_rescan_queue(tmp_path, make_config, monkeypatch):
+    target = tmp_path / 'mirror'
+    manager = ExportManager(make_config(exports=[{'type': 'directory', 'path': str(target)}]))
+    scans = []
+    original = manager._pending_jobs
+    monkeypatch.setattr(manager, '_pending_jobs', lambda: scans.append(1) or original())
+    try:
+        for path in make_files(tmp_path, 30):
+            manager.submit(str(path))
+        assert wait_for(lambda: manager.pending() == 0)
+        assert manager.flush(timeout=5)
+    finally:
+        manager.stop()
+    assert len(list(target.iterdir())) == 30
+    assert len(scans) <= 2  # Only when the worker starts
@@ -0,0 +1,84 @@
+"""
+Tests for the shared-memory frame ring.
+"""
+
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+from PIL import Image
+
+from shotux.frame_ring import FrameClient, FramePublisher
+from shotux.screenshot_manager import ScreenshotManager
+
+
+@pytest.fixture
+def ring_name():
+    return f"shotux-test-{uuid.uuid4().hex[:8]}"
+
+
+def test_publish_and_read_back(ring_name):
+    publisher = FramePublisher(ring_name, max_frame_bytes=64 * 48 * 4)
+    client = FrameClient(ring_name)
+    try:
+        image = Image.frombytes('RGBA', (64, 48), os.urandom(64 * 48 * 4))
+        sequence = publisher.publish(image)
+        frame = client.latest()
+        assert frame.sequence == sequence
+        assert frame.to_image().tobytes() == image.tobytes()
+        frame.release()
+    finally:
+        client.close()
+        publisher.close()
+
+
+def test_frame_of_exact_capacity_fits(ring_name):
+    publisher = FramePublisher(ring_name, max_frame_bytes=64 * 64 * 4)
+    try:
+        assert publisher.publish(Image.new('RGBA', (64, 64))) == 1
+    finally:
+        publisher.close()
+
+
+def test_live_owner_is_not_taken_over(ring_name):
+    owner = subprocess.Popen(
+        [sys.executable, '-c',
+         'import sys; from shotux.frame_ring import FramePublisher; '
+         'p = FramePublisher(sys.argv[1], max_frame_bytes=1024); print("ready", flush=True); '
+         'sys.stdin.read(); p.close()', ring_name],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        assert owner.stdout.readline().strip() == 'ready'
+        with pytest.raises(FileExistsError):
+            FramePublisher(ring_name, max_frame_bytes=1024)
+        client = FrameClient(ring_name)  # The owner's ring is still there
+        client.close()
+    finally:
+        owner.communicate('')
+
+
+def test_publish_frame_grows_ring_and_never_raises(ring_name, make_config):
+    manager = ScreenshotManager(make_config({'shared_memory.enabled': True,
+                                             'shared_memory.name': ring_name,
+                                             'shared_memory.max_frame_bytes': 32 * 32 * 4}))
+    try:
+        assert manager.publish_frame(Image.new('RGB', (32, 32))) == 1
+        client = FrameClient(ring_name)
+        tall = Image.new('RGB', (32, 4000))
+        assert manager.publish_frame(tall) == 1  # A new, larger ring
+        assert client.retired()
+        client.close()
+
+        client = FrameClient(ring_name)
+        frame = client.latest()
+        assert (frame.width, frame.height) == (32, 4000)
+        frame.release()
+        client.close()
+
+        manager.frame_publisher.shm.close()  # Simulate a broken ring
+        assert manager.publish_frame(Image.new('RGB', (32, 32))) is None
+    finally:
+        manager.close_frame_ring()
@@ -0,0 +1,122 @@
+"""
+Tests for tile-based screenshot comparison.
+"""
+
+import sys
+
+import pytest
+from PIL import Image
+
+from shotux import cli
+from shotux.image_diff import compare_images, diff_directories, diff_files
+
+
+def blank(size=(256, 192), color=(40, 40, 40)):
+    return Image.new('RGB', size, color)
+
+
+def changed(image, points, color=(200, 10, 10)):
+    image = image.copy()
+    for point in points:
+        image.putpixel(point, color)
+    return image
+
+
+def test_identical_images_are_same():
+    result = compare_images(blank(), blank())
+    assert result['same'] is True
+    assert result['changed_tiles'] == 0 and result['boxes'] == []
+
+
+def test_single_pixel_change_is_located():
+    result = compare_images(blank(), changed(blank(), [(130, 70)]), tile_size=64)
+    assert result['same'] is False
+    assert result['changed_pixels'] == 1
+    assert list(result['masks']) == [(2, 1)]
+    assert result['boxes'] == [[130, 70, 1, 1]]
+
+
+def test_tolerance_ignores_small_channel_moves():
+    after = changed(blank(), [(10, 10)], color=(45, 40, 40))
+    assert compare_images(blank(), after, tolerance=5)['same'] is True
+    assert compare_images(blank(), after, tolerance=4)['changed_pixels'] == 1
+
+
+def test_min_pixels_ignores_sparse_tiles():
+    after = changed(blank(), [(1, 1), (2, 2), (3, 3)])
+    assert compare_images(blank(), after, min_pixels=4)['same'] is True
+    assert compare_images(blank(), after, min_pixels=3)['changed_pixels'] == 3
+
+
+def test_touching_tiles_merge_into_one_box():
+    # Diagonal neighbours merge; a far tile stays separate
+    after = changed(blank(), [(63, 63), (64, 64), (250, 5)])
+    result = compare_images(blank(), after, tile_size=64)
+    assert result['changed_tiles'] == 3
+    assert sorted(result['boxes']) == [[63, 63, 2, 2], [250, 5, 1, 1]]
+
+
+def test_alpha_only_change_is_detected():
+    before = Image.new('RGBA', (32, 32), (0, 0, 0, 255))
+    after = changed(before, [(5, 5)], color=(0, 0, 0, 0))
+    assert compare_images(before, after)['changed_pixels'] == 1
+
+
+def test_stop_early_returns_first_changed_tile():
+    after = changed(blank(), [(x, y) for x in range(0, 256, 64) for y in range(0, 192, 64)])
+    assert compare_images(blank(), after, tile_size=64)['changed_tiles'] == 12
+    assert compare_images(blank(), after, tile_size=64, stop_early=True)['changed_tiles'] == 1
+
+
+def test_size_mismatch_is_different():
+    result = compare_images(blank((10, 10)), blank((10, 11)))
+    assert result['same'] is False and result['size_mismatch'] == [[10, 10], [10, 11]]
+
+
+def test_tile_size_must_be_positive():
+    with pytest.raises(ValueError):
+        compare_images(blank(), blank(), tile_size=0)
+
+
+def test_diff_files_writes_highlight(tmp_path):
+    blank().save(tmp_path / 'a.png')
+    changed(blank(), [(20, 20)]).save(tmp_path / 'b.png')
+    summary = diff_files(str(tmp_path / 'a.png'), str(tmp_path / 'b.png'),
+                         str(tmp_path / 'out' / 'diff.png'))
+    assert summary['same'] is False
+    assert Image.open(summary['diff_image']).getpixel((20, 20)) == (255, 0, 0)
+
+
+def make_dirs(tmp_path, count, different=()):
+    before, after = tmp_path / 'before', tmp_path / 'after'
+    before.mkdir()
+    after.mkdir()
+    for i in range(count):
+        blank().save(before / f"{i:03d}.png")
+        (changed(blank(), [(1, 1)]) if i in different else blank()).save(after / f"{i:03d}.png")
+    return str(before), str(after)
+
+
+def test_diff_directories_reports_every_pair(tmp_path):
+    before, after = make_dirs(tmp_path, 6, different={2})
+    (tmp_path / 'before' / 'only.png').write_bytes((tmp_path / 'before' / '000.png').read_bytes())
+    summaries = list(diff_directories(before, after, workers=2))
+    assert len(summaries) == 7
+    assert [s.get('name') for s in summaries if 'error' in s] == ['only.png']
+    assert sum(not s['same'] for s in summaries) == 2
+
+
+def test_diff_directories_check_mode_stops_at_first_difference(tmp_path):
+    before, after = make_dirs(tmp_path, 40, different={0})
+    summaries = list(diff_directories(before, after, workers=1, stop_early=True))
+    assert not summaries[-1]['same']
+    assert len(summaries) < 40
+
+
+@pytest.mark.parametrize('value', ['0', '-3'])
+def test_cli_rejects_non_positive_tile_size(monkeypatch, capsys, value):
+    monkeypatch.setattr(sys, 'argv', ['shotux-cli', 'diff', 'a.png', 'b.png', '--tile-size', value])
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main()
+    assert exit_info.value.code == 2
+    assert 'tile-size' in capsys.readouterr().err
@@ -0,0 +1,68 @@
+"""
+Tests for the metrics registry and textfile exporter.
+"""
+
+import gc
+import threading
+
+from PIL import Image
+
+from shotux import screenshot_manager
+from shotux.metrics import MetricsExporter, MetricsRegistry, metrics_textfiles
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gc.collect()
+
+
+def test_dead_thread_shards_are_folded_into_totals():
+    registry = MetricsRegistry()
+    registry.inc('jobs_total')
+
+    def work():
+        registry.inc('jobs_total', 2)
+        registry.observe('work_seconds', 0.02)
+
+    run_threads(50, work)
+
+    counter = registry.metric('jobs_total')
+    histogram = registry.metric('work_seconds')
+    assert counter.value() == 101
+    assert len(counter.shards) == 1  # Only the main thread's shard is left
+    assert len(histogram.shards) == 0
+    cumulative, count, total = histogram.snapshot()
+    assert count == 50 and cumulative[-1] == 50
+    assert abs(total - 1.0) < 1e-9
+
+
+def test_each_role_writes_its_own_labelled_file(make_config):
+    registry = MetricsRegistry()
+    registry.inc('shotux_failures_total', backend='scrot')
+    config = make_config()
+
+    for role in ('gui', 'batch'):
+        MetricsExporter(config, role, registry=registry).write()
+
+    paths = metrics_textfiles(config)
+    assert [path.name for path in paths] == ['metrics-batch.prom', 'metrics-gui.prom']
+    text = paths[1].read_text()
+    assert 'shotux_failures_total{role="gui",backend="scrot"} 1' in text
+    assert 'shotux_uptime_seconds{role="gui"}' in text
+
+
+def test_interactive_scrot_captures_stay_out_of_latency(make_config, monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(screenshot_manager, 'metrics', registry)
+    manager = screenshot_manager.ScreenshotManager(make_config())
+    monkeypatch.setattr(manager, '_run_scrot', lambda mode, geometry=None: Image.new('RGB', (4, 4)))
+
+    for mode in ('window', 'region', 'fullscreen'):
+        manager._capture_with_scrot(mode)
+
+    _, count, _ = registry.metric('shotux_capture_seconds', backend='scrot').snapshot()
+    assert count == 1
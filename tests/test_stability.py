@@ -0,0 +1,37 @@
+"""
+Tests for waiting until the screen settles before a capture.
+"""
+
+from PIL import Image
+
+from shotux import screenshot_manager
+from shotux.screenshot_manager import ScreenshotManager
+
+
+def test_samples_only_the_target_area(make_config, monkeypatch):
+    boxes = []
+
+    def grab(bbox=None):
+        boxes.append(bbox)
+        return Image.new('RGB', (64, 64))
+
+    monkeypatch.setattr(screenshot_manager.ImageGrab, 'grab', grab)
+    manager = ScreenshotManager(make_config({'stability.sample_interval': 0}))
+    waited, stable = manager.wait_before_capture(until_stable=True, bbox=(10, 20, 110, 220))
+
+    assert stable is True
+    assert set(boxes) == {(10, 20, 110, 220)}
+
+
+def test_falls_back_to_delay_when_sampling_fails(make_config, monkeypatch):
+    def grab(bbox=None):
+        raise OSError("X connection failed")
+
+    slept = []
+    monkeypatch.setattr(screenshot_manager.ImageGrab, 'grab', grab)
+    monkeypatch.setattr(screenshot_manager.time, 'sleep', slept.append)
+    manager = ScreenshotManager(make_config())
+    waited, stable = manager.wait_before_capture(delay=2, until_stable=True)
+
+    assert stable is None
+    assert slept and 1.9 < slept[0] <= 2
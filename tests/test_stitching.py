@@ -0,0 +1,212 @@
+"""
+Tests for scrolling-capture overlap detection and stitching.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+from PIL import Image
+
+from shotux.screenshot_manager import ScreenshotManager
+from shotux.stitching import StripWriter, find_overlap, row_hashes
+
+WIDTH = 64
+
+
+def random_page(height, width=WIDTH):
+    """A tall page where every row is distinct."""
+    return Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+
+
+def periodic_page(height, period, width=WIDTH):
+    """A tall page whose rows repeat every period pixels, like a list."""
+    tile = random_page(period, width)
+    page = Image.new('RGB', (width, height))
+    for top in range(0, height, period):
+        page.paste(tile, (0, top))
+    return page
+
+
+def text_page(height, width=WIDTH, line=12, gap=10):
+    """A page of text lines separated by blank gaps, like a document."""
+    page = Image.new('RGB', (width, height), 'white')
+    for top in range(0, height, line + gap):
+        page.paste(random_page(line, width), (0, top))
+    return page
+
+
+def view(page, top, height):
+    return page.crop((0, top, page.width, top + height))
+
+
+def test_row_hashes_one_per_row():
+    page = random_page(120)
+    hashes = row_hashes(page)
+    assert len(hashes) == 120
+    assert hashes[10:20] == row_hashes(view(page, 10, 10))
+
+
+def test_find_overlap_exact():
+    page = random_page(2000)
+    previous = row_hashes(view(page, 0, 800))
+    current = row_hashes(view(page, 137, 800))
+    assert find_overlap(previous, current) == 800 - 137
+
+
+def test_find_overlap_none():
+    previous = row_hashes(random_page(400))
+    current = row_hashes(random_page(400))
+    assert find_overlap(previous, current) == 0
+
+
+def test_find_overlap_below_minimum():
+    page = random_page(1000)
+    previous = row_hashes(view(page, 0, 400))
+    current = row_hashes(view(page, 396, 400))
+    assert find_overlap(previous, current, min_overlap=8) == 0
+    assert find_overlap(previous, current, min_overlap=2) == 4
+
+
+def test_find_overlap_periodic_uses_expected():
+    page = periodic_page(3000, period=100)
+    previous = row_hashes(view(page, 0, 800))
+    current = row_hashes(view(page, 250, 800))
+    assert find_overlap(previous, current, expected=550) == 550
+    # Without a hint the smallest candidate wins, so no rows are dropped
+    assert find_overlap(previous, current) <= 550
+
+
+def test_find_overlap_ignores_blank_gap_matches():
+    page = text_page(3000)
+    # A blank gap at the bottom of one frame also matches the top of the next
+    previous = row_hashes(view(page, 0, 616))
+    current = row_hashes(view(page, 254, 616))
+    assert find_overlap(previous, current) == 362
+    for offset in range(16, 600):
+        current = row_hashes(view(page, offset, 616))
+        assert find_overlap(previous, current) == 616 - offset
+
+
+def test_find_overlap_only_blank_rows_match():
+    blank = [0] * 40
+    assert find_overlap([1, 2] + blank, blank + [3, 4]) == 40
+
+
+def test_capture_scrolling_text_page_without_hint(make_config):
+    page = text_page(3000)
+    position = [0]
+    manager = ScreenshotManager(make_config({'scrolling.settle_ms': 0,
+                                             'scrolling.max_frames': 100}))
+    manager.capture_geometry = lambda x, y, w, h: view(page, position[0], h)
+
+    def scroll(x, y, clicks):
+        position[0] = min(page.height - 616, position[0] + 254)
+
+    manager._scroll = scroll
+    stitched = manager.capture_scrolling(0, 0, WIDTH, 616)
+    assert stitched.size == page.size
+    assert stitched.tobytes() == page.tobytes()
+
+
+def test_capture_scrolling_synthetic_long_page(make_config):
+    page = random_page(5000)
+    position = [0]
+    manager = ScreenshotManager(make_config({'scrolling.settle_ms': 0,
+                                             'scrolling.max_frames': 100}))
+    manager.capture_geometry = lambda x, y, w, h: view(page, position[0], h)
+
+    def scroll(x, y, clicks):
+        position[0] = min(page.height - 600, position[0] + 173)
+
+    manager._scroll = scroll
+    stitched = manager.capture_scrolling(0, 0, WIDTH, 600)
+    assert stitched.size == page.size
+    assert stitched.tobytes() == page.tobytes()
+
+
+def test_capture_scrolling_periodic_page_keeps_every_row(make_config):
+    page = periodic_page(800 + 12 * 250, period=100)
+    position = [0]
+    manager = ScreenshotManager(make_config({'scrolling.settle_ms': 0,
+                                             'scrolling.max_frames': 100,
+                                             'scrolling.scroll_clicks': 5,
+                                             'scrolling.pixels_per_click': 50}))
+    manager.capture_geometry = lambda x, y, w, h: view(page, position[0], h)
+
+    def scroll(x, y, clicks):
+        position[0] = min(page.height - 800, position[0] + clicks * 50)
+
+    manager._scroll = scroll
+    stitched = manager.capture_scrolling(0, 0, WIDTH, 800)
+    assert stitched.tobytes() == page.tobytes()
+
+
+def test_strip_writer_assembles_strips():
+    page = random_page(300)
+    writer = StripWriter(WIDTH)
+    for top in range(0, 300, 100):
+        writer.append(view(page, top, 100))
+    assert writer.finish().tobytes() == page.tobytes()
+    assert not os.path.exists(writer.path)
+
+
+SCROLLER = r'''
+import sys
+import tkinter as tk
+root = tk.Tk()
+root.overrideredirect(True)
+root.geometry("{width}x{height}+0+0")
+photo = tk.PhotoImage(file=sys.argv[1])
+canvas = tk.Canvas(root, width={width}, height={height}, highlightthickness=0, bd=0,
+                   yscrollincrement={step}, scrollregion=(0, 0, {width}, {page_height}))
+canvas.create_image(0, 0, image=photo, anchor="nw")
+canvas.place(x=0, y=0)
+canvas.bind_all("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))
+root.after(200, lambda: print("ready", flush=True))
+root.mainloop()
+'''
+
+
+@pytest.mark.skipif(not (shutil.which('Xvfb') and shutil.which('xdotool')),
+                    reason="needs Xvfb and xdotool")
+def test_capture_scrolling_under_xvfb(tmp_path, make_config):
+    width, height, step, page_height = 320, 240, 20, 1500
+    page = random_page(page_height, width)
+    page_path = tmp_path / 'page.png'
+    page.save(page_path)
+
+    display = ':97'
+    xvfb = subprocess.Popen(['Xvfb', display, '-screen', '0', '640x480x24', '-nolisten', 'tcp'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    env = dict(os.environ, DISPLAY=display)
+    scroller = None
+    old_display = os.environ.get('DISPLAY')
+    try:
+        time.sleep(1)
+        script = SCROLLER.format(width=width, height=height, step=step, page_height=page_height)
+        scroller = subprocess.Popen([sys.executable, '-c', script, str(page_path)],
+                                    env=env, stdout=subprocess.PIPE, text=True)
+        assert scroller.stdout.readline().strip() == 'ready'
+
+        os.environ['DISPLAY'] = display
+        manager = ScreenshotManager(make_config({'scrolling.settle_ms': 200,
+                                                 'scrolling.max_frames': 200,
+                                                 'scrolling.scroll_clicks': 3,
+                                                 'scrolling.pixels_per_click': step}))
+        stitched = manager.capture_scrolling(0, 0, width, height)
+        assert stitched.size == page.size
+        assert stitched.tobytes() == page.convert('RGB').tobytes()
+    finally:
+        if old_display is None:
+            os.environ.pop('DISPLAY', None)
+        else:
+            os.environ['DISPLAY'] = old_display
+        if scroller:
+            scroller.terminate()
+            scroller.wait()
+        xvfb.terminate()
+        xvfb.wait()